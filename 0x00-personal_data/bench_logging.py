@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Caller-side latency of logging a user record through a synchronous
+StreamHandler with RedactingFormatter, against the queued pipeline of
+get_logger() (redaction, formatting and batched writes in background),
+back to back and paced by 100 us of simulated request I/O per record.
+Usage: ./bench_logging.py [records]   (default: 100000; paced: a tenth)
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from filtered_logger import (PII_FIELDS, BatchingStreamHandler,
+                             RedactingFormatter, queued_handler)
+
+
+def caller_latency(logger: logging.Logger, records: int,
+                   pause: float = 0) -> List[int]:
+    """
+    Log `records` user lines, sleeping `pause` seconds between them, and
+    return each call's latency in ns.
+    """
+    latencies = []
+    for i in range(records):
+        if pause:
+            time.sleep(pause)
+        start = time.perf_counter_ns()
+        logger.info("name=user%d;email=user%d@example.com;phone=(555) %07d;"
+                    "ssn=%09d;password=hash%d;ip=10.0.0.1;"
+                    "last_login=2019-11-14T06:16:24;user_agent=Mozilla/5.0;",
+                    i, i, i, i, i)
+        latencies.append(time.perf_counter_ns() - start)
+    return latencies
+
+
+def summary(latencies: List[int]) -> Dict[str, float]:
+    """
+    Return the mean, p50 and p99 of latencies, in microseconds.
+    """
+    ordered = sorted(latencies)
+    return {"mean": sum(ordered) / len(ordered) / 1000,
+            "p50": ordered[len(ordered) // 2] / 1000,
+            "p99": ordered[int(len(ordered) * 0.99)] / 1000}
+
+
+if __name__ == "__main__":
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tmp_dir = tempfile.mkdtemp()
+    fields = list(PII_FIELDS)
+
+    sync_log = open(os.path.join(tmp_dir, "sync.log"), "w")
+    sync_handler = logging.StreamHandler(sync_log)
+    sync_handler.setFormatter(RedactingFormatter(fields))
+    sync_logger = logging.getLogger("bench_sync")
+    sync_logger.propagate = False
+    sync_logger.setLevel(logging.INFO)
+    sync_logger.addHandler(sync_handler)
+
+    queued_log = open(os.path.join(tmp_dir, "queued.log"), "w")
+    batching_handler = BatchingStreamHandler(queued_log)
+    batching_handler.setFormatter(RedactingFormatter(fields))
+    queue_handler = queued_handler(batching_handler, queue_size=records,
+                                   overflow="block")
+    queued_logger = logging.getLogger("bench_queued")
+    queued_logger.propagate = False
+    queued_logger.setLevel(logging.INFO)
+    queued_logger.addHandler(queue_handler)
+
+    print("{} records back to back, {} paced".format(records,
+                                                     records // 10))
+    for pause, count in ((0, records), (0.0001, records // 10)):
+        start = time.perf_counter()
+        sync = summary(caller_latency(sync_logger, count, pause))
+        sync_total = time.perf_counter() - start
+        start = time.perf_counter()
+        queued = summary(caller_latency(queued_logger, count, pause))
+        queued_callers = time.perf_counter() - start
+        queue_handler.listener.queue.join()
+        queued_total = time.perf_counter() - start
+        label = "paced " if pause else "b2b   "
+        print(label + "sync    mean {mean:6.1f} us  p50 {p50:6.1f} us  "
+              "p99 {p99:6.1f} us".format(**sync) +
+              "  total {:.2f}s".format(sync_total))
+        print(label + "queued  mean {mean:6.1f} us  p50 {p50:6.1f} us  "
+              "p99 {p99:6.1f} us".format(**queued) +
+              "  callers {:.2f}s, drained {:.2f}s".format(
+                  queued_callers, queued_total))
+    queue_handler.listener.stop()
+    sync_log.close()
+    queued_log.close()
+    with open(os.path.join(tmp_dir, "queued.log")) as f:
+        assert sum(1 for _ in f) == records + records // 10
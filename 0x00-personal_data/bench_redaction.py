@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark of filter_datum (one cached regex per field set, on
+str and on bytes) against a naive loop of one re.sub per field.
+Usage: ./bench_redaction.py [lines]   (default: 200000)
+"""
+import random
+import re
+import sys
+import time
+from typing import Callable, List
+from filtered_logger import PII_FIELDS, filter_datum
+
+
+def naive_filter_datum(fields: List[str], redaction: str, message: str,
+                       separator: str) -> str:
+    """
+    Mask the fields with one re.sub per field, compiled on every call.
+    """
+    for field in fields:
+        message = re.sub("{}=.*?{}".format(field, separator),
+                         "{}={}{}".format(field, redaction, separator),
+                         message)
+    return message
+
+
+def make_lines(count: int) -> List[str]:
+    """
+    Build `count` user log lines of about 200 characters.
+    """
+    rng = random.Random(42)
+    lines = []
+    for i in range(count):
+        lines.append(
+            "name=user{0};email=user{0}@example.com;phone=(555) {1:07d};"
+            "ssn={2:03d}-{3:02d}-{4:04d};password=p{5:x};ip=10.0.{6}.{7};"
+            "last_login=2019-11-14T06:16:24;user_agent=Mozilla/5.0;".format(
+                i, rng.randrange(10 ** 7), rng.randrange(1000),
+                rng.randrange(100), rng.randrange(10000),
+                rng.getrandbits(64), rng.randrange(256), rng.randrange(256)))
+    return lines
+
+
+def lines_per_second(redact: Callable, lines: List) -> float:
+    """
+    Return how many lines per second `redact` masks.
+    """
+    start = time.perf_counter()
+    for line in lines:
+        redact(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    fields = list(PII_FIELDS)
+    lines = make_lines(count)
+    encoded = [line.encode() for line in lines]
+    for line in lines[:1000]:
+        assert filter_datum(fields, "***", line, ";") == \
+            naive_filter_datum(fields, "***", line, ";")
+
+    naive = lines_per_second(
+        lambda line: naive_filter_datum(fields, "***", line, ";"), lines)
+    cached = lines_per_second(
+        lambda line: filter_datum(fields, "***", line, ";"), lines)
+    raw = lines_per_second(
+        lambda line: filter_datum(fields, b"***", line, b";"), encoded)
+    print("{} lines, {} fields".format(count, len(fields)))
+    print("naive re.sub per field {:>10.0f} lines/s".format(naive))
+    print("filter_datum (str)     {:>10.0f} lines/s  x{:.1f}".format(
+        cached, cached / naive))
+    print("filter_datum (bytes)   {:>10.0f} lines/s  x{:.1f}".format(
+        raw, raw / naive))
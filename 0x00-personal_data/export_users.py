@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Stream the users table to CSV or JSONL with the PII columns redacted,
+in constant memory: rows are read with an unbuffered cursor in fetchmany
+batches and written as they arrive.
+Usage: ./export_users.py [--format csv|jsonl] [--output FILE]
+                         [--sqlite DB [--seed ROWS]] [--batch-size N]
+Without --sqlite the rows come from get_db() (PERSONAL_DATA_DB_* env).
+"""
+import argparse
+import csv
+import json
+import resource
+import sqlite3
+import sys
+import time
+from typing import Any, Iterator, List, Sequence, TextIO, Tuple
+from filtered_logger import PII_FIELDS, RedactingFormatter, get_db
+
+USERS_COLUMNS = ("name", "email", "phone", "ssn", "password", "ip",
+                 "last_login", "user_agent")
+
+
+def stream_rows(connection: Any, table: str = "users",
+                batch_size: int = 1000) -> Tuple[List[str],
+                                                 Iterator[Sequence]]:
+    """
+    Stream the rows of a table without loading them all in memory.
+
+    Args:
+        connection (Any): A mysql.connector or sqlite3 connection.
+        table (str): The table to read.
+        batch_size (int): Rows fetched per round trip.
+
+    Returns:
+        Tuple[List[str], Iterator[Sequence]]: The column names and the
+            rows.
+    """
+    if isinstance(connection, sqlite3.Connection):
+        cursor = connection.cursor()
+    else:
+        # rows stay on the server until fetched
+        cursor = connection.cursor(buffered=False)
+    cursor.execute("SELECT * FROM {};".format(table))
+    columns = [description[0] for description in cursor.description]
+
+    def rows() -> Iterator[Sequence]:
+        """
+        Yield the rows batch by batch, then close the cursor.
+        """
+        try:
+            batch = cursor.fetchmany(batch_size)
+            while batch:
+                yield from batch
+                batch = cursor.fetchmany(batch_size)
+        finally:
+            cursor.close()
+    return columns, rows()
+
+
+def redacted(columns: List[str], rows: Iterator[Sequence],
+             fields: Sequence[str] = PII_FIELDS) -> Iterator[List]:
+    """
+    Mask the values of the PII columns of each row.
+
+    Args:
+        columns (List[str]): The column names.
+        rows (Iterator[Sequence]): The rows.
+        fields (Sequence[str]): The columns to mask.
+
+    Returns:
+        Iterator[List]: The rows with the PII values masked.
+    """
+    masked = [i for i, column in enumerate(columns) if column in fields]
+    for row in rows:
+        row = list(row)
+        for i in masked:
+            if row[i] is not None:
+                row[i] = RedactingFormatter.REDACTION
+        yield row
+
+
+def export(columns: List[str], rows: Iterator[List], out: TextIO,
+           fmt: str = "csv") -> int:
+    """
+    Write rows to a stream as CSV (with a header) or JSON lines.
+
+    Args:
+        columns (List[str]): The column names.
+        rows (Iterator[List]): The rows.
+        out (TextIO): The output stream.
+        fmt (str): "csv" or "jsonl".
+
+    Returns:
+        int: The number of rows written.
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            out.write(json.dumps(dict(zip(columns, row)), default=str))
+            out.write("\n")
+            count += 1
+    return count
+
+
+def seed_sqlite(path: str, rows: int) -> None:
+    """
+    Create a SQLite stand-in of the users table with `rows` fake users.
+
+    Args:
+        path (str): The SQLite database file.
+        rows (int): The number of users to insert.
+    """
+    connection = sqlite3.connect(path)
+    connection.execute("DROP TABLE IF EXISTS users;")
+    connection.execute("CREATE TABLE users ({});".format(
+        ", ".join("{} TEXT".format(column) for column in USERS_COLUMNS)))
+    connection.executemany(
+        "INSERT INTO users VALUES ({});".format(
+            ", ".join("?" * len(USERS_COLUMNS))),
+        (("user{}".format(i), "user{}@example.com".format(i),
+          "(555) {:07d}".format(i), "{:09d}".format(i), "hash{}".format(i),
+          "10.0.{}.{}".format(i // 256 % 256, i % 256),
+          "2019-11-14 06:16:24", "Mozilla/5.0")
+         for i in range(rows)))
+    connection.commit()
+    connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--format", choices=("csv", "jsonl"),
+                        default="csv")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    parser.add_argument("--sqlite", help="read a SQLite stand-in instead")
+    parser.add_argument("--seed", type=int,
+                        help="first fill the SQLite stand-in with ROWS users")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.sqlite:
+        if args.seed:
+            seed_sqlite(args.sqlite, args.seed)
+        db = sqlite3.connect(args.sqlite)
+    else:
+        db = get_db()
+        if db is None:
+            sys.exit(1)
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        columns, rows = stream_rows(db, batch_size=args.batch_size)
+        count = export(columns, redacted(columns, rows), out, args.format)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        db.close()
+    elapsed = time.perf_counter() - start
+    print("exported {} rows in {:.2f}s ({:.0f} rows/s), max RSS {:.1f} MB"
+          .format(count, elapsed, count / elapsed if elapsed else 0,
+                  resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+          file=sys.stderr)
@@ -1,7 +1,336 @@
+#!/usr/bin/env python3
+"""
+Personal data helpers: PII redaction of log lines and the database
+connection.
+"""
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from typing import (Any, AnyStr, Callable, Dict, Iterator, List, Optional,
+                    Sequence, Tuple)
 import mysql.connector
 from mysql.connector import errorcode
-from typing import Optional
+
+PII_FIELDS = ("name", "email", "phone", "ssn", "password")
+LOG_QUEUE_SIZE = int(os.getenv('PERSONAL_DATA_LOG_QUEUE_SIZE', '10000'))
+LOG_OVERFLOW = os.getenv('PERSONAL_DATA_LOG_OVERFLOW', 'block')
+LOG_BATCH_SIZE = int(os.getenv('PERSONAL_DATA_LOG_BATCH_SIZE', '256'))
+
+
+@lru_cache(maxsize=128)
+def _redactor(fields: Tuple[str, ...], redaction: AnyStr,
+              separator: AnyStr) -> Callable[[AnyStr], AnyStr]:
+    """
+    Compile one regex matching every field of a field set and return a
+    function masking their values, cached per field set.
+
+    Args:
+        fields (Tuple[str, ...]): The fields to mask.
+        redaction (AnyStr): What a value is replaced with.
+        separator (AnyStr): The character ending each key=value pair.
+
+    Returns:
+        Callable[[AnyStr], AnyStr]: The masking function, on str or bytes
+            like the separator.
+    """
+    is_bytes = isinstance(separator, bytes)
+    sep = re.escape(separator.decode() if is_bytes else separator)
+    if isinstance(redaction, bytes):
+        redaction = redaction.decode()
+    # scan for the literal "=" (fast) and only then check which field
+    # name precedes it; the name must start the message or follow a
+    # separator or a space, so "name" does not match "username="
+    names = "|".join("(?<={0}=)(?<![^{1}\\s]{0}=)".format(
+        re.escape(field), sep) for field in fields)
+    pattern = "=(?:{})[^{}]*".format(names, sep)
+    # a template without group references is substituted as is
+    template = "=" + redaction.replace("\\", "\\\\")
+    if is_bytes:
+        return partial(re.compile(pattern.encode()).sub, template.encode())
+    return partial(re.compile(pattern).sub, template)
+
+
+def filter_datum(fields: List[str], redaction: AnyStr, message: AnyStr,
+                 separator: AnyStr) -> AnyStr:
+    """
+    Mask the values of the given fields in a log message.
+
+    Args:
+        fields (List[str]): The fields to mask.
+        redaction (AnyStr): What each value is replaced with.
+        message (AnyStr): The key=value log line, as str or as bytes (no
+            decoding needed for already encoded lines).
+        separator (AnyStr): The character ending each key=value pair.
+
+    Returns:
+        AnyStr: The message with the field values masked.
+    """
+    return _redactor(tuple(fields), redaction, separator)(message)
+
+
+class RedactingFormatter(logging.Formatter):
+    """
+    Redacting Formatter class
+    """
+
+    REDACTION = "***"
+    FORMAT = "[HOLBERTON] %(name)s %(levelname)s %(asctime)-15s: %(message)s"
+    SEPARATOR = ";"
+
+    def __init__(self, fields: Sequence[str]) -> None:
+        """
+        Initialize the formatter with the fields to mask.
+
+        Args:
+            fields (Sequence[str]): The fields to mask.
+        """
+        super(RedactingFormatter, self).__init__(self.FORMAT)
+        self.fields = tuple(fields)
+        self._redact = _redactor(self.fields, self.REDACTION,
+                                 self.SEPARATOR)
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a record and mask the values of the fields.
+
+        Args:
+            record (logging.LogRecord): The record to format.
+
+        Returns:
+            str: The formatted, redacted line.
+        """
+        return self._redact(super(RedactingFormatter, self).format(record))
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler on a bounded queue. When the queue is full, "block"
+    waits for room, "drop_new" drops the record and "drop_old" drops the
+    oldest queued record to make room; dropped records are counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue,
+                 overflow: str = "block") -> None:
+        """
+        Initialize the handler.
+
+        Args:
+            log_queue (queue.Queue): The bounded queue to fill.
+            overflow (str): "block", "drop_new" or "drop_old".
+        """
+        if overflow not in ("block", "drop_new", "drop_old"):
+            raise ValueError("Unknown overflow policy: {}".format(overflow))
+        super(BoundedQueueHandler, self).__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the arguments and exception into the message, in place:
+        the record is only formatted by the background handler, so the
+        copy QueueHandler makes is skipped.
+
+        Args:
+            record (logging.LogRecord): The record to queue.
+
+        Returns:
+            logging.LogRecord: The same record.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.msg += "\n" + logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+            record.exc_text = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Queue a record, applying the overflow policy if the queue is full.
+
+        Args:
+            record (logging.LogRecord): The prepared record.
+        """
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                self.dropped += 1
+                if self.overflow == "drop_new":
+                    return
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class BatchingStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler that formats records as they come but writes them in
+    batches: when `batch_size` lines are buffered or on flush().
+    """
+
+    def __init__(self, stream: Any = None, batch_size: int = 256) -> None:
+        """
+        Initialize the handler.
+
+        Args:
+            stream (Any): The stream written to, sys.stderr by default.
+            batch_size (int): Lines buffered before a write.
+        """
+        super(BatchingStreamHandler, self).__init__(stream)
+        self.batch_size = batch_size
+        self._buffer = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Format a record into the buffer, writing the batch once full.
+
+        Args:
+            record (logging.LogRecord): The record to write.
+        """
+        try:
+            self._buffer.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered lines with a single write.
+        """
+        self.acquire()
+        try:
+            if self._buffer:
+                lines, self._buffer = self._buffer, []
+                self.stream.write(self.terminator.join(lines) +
+                                  self.terminator)
+            super(BatchingStreamHandler, self).flush()
+        finally:
+            self.release()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that flushes its handlers whenever the queue runs
+    empty, so batches never wait for more records, and on stop().
+    """
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        """
+        Return the next record, flushing the handlers before waiting.
+
+        Args:
+            block (bool): Whether to wait for a record.
+
+        Returns:
+            logging.LogRecord: The next record.
+        """
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            for handler in self.handlers:
+                handler.flush()
+            return self.queue.get(block)
+
+    def enqueue_sentinel(self) -> None:
+        """
+        Queue the stop sentinel, waiting for room in a full queue.
+        """
+        self.queue.put(self._sentinel)
+
+    def stop(self) -> None:
+        """
+        Process the queued records, stop the thread and flush.
+        """
+        if self._thread is not None:
+            super(BatchingQueueListener, self).stop()
+            for handler in self.handlers:
+                handler.flush()
+
+
+def queued_handler(handler: logging.Handler, queue_size: int = None,
+                   overflow: str = None) -> BoundedQueueHandler:
+    """
+    Put a handler behind a bounded queue served by a background thread,
+    stopped (and drained) at exit.
+
+    Args:
+        handler (logging.Handler): The handler run in the background.
+        queue_size (int): The queue bound, LOG_QUEUE_SIZE by default.
+        overflow (str): The overflow policy, LOG_OVERFLOW by default.
+
+    Returns:
+        BoundedQueueHandler: The handler to add to a logger; its
+            `listener` is the background QueueListener.
+    """
+    log_queue = queue.Queue(LOG_QUEUE_SIZE if queue_size is None
+                            else queue_size)
+    queue_handler = BoundedQueueHandler(
+        log_queue, LOG_OVERFLOW if overflow is None else overflow)
+    queue_handler.listener = BatchingQueueListener(log_queue, handler)
+    queue_handler.listener.start()
+    atexit.register(queue_handler.listener.stop)
+    return queue_handler
+
+
+def get_logger() -> logging.Logger:
+    """
+    Return the "user_data" logger. Callers only queue their records;
+    a background thread redacts the PII_FIELDS, formats and writes them
+    to stderr in batches, and drains the queue at exit.
+
+    Queue size, overflow policy and batch size come from
+    PERSONAL_DATA_LOG_QUEUE_SIZE, PERSONAL_DATA_LOG_OVERFLOW and
+    PERSONAL_DATA_LOG_BATCH_SIZE.
+
+    Returns:
+        logging.Logger: The logger.
+    """
+    logger = logging.getLogger("user_data")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if any(isinstance(handler, BoundedQueueHandler)
+           for handler in logger.handlers):
+        return logger
+
+    stream_handler = BatchingStreamHandler(batch_size=LOG_BATCH_SIZE)
+    stream_handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
+    logger.addHandler(queued_handler(stream_handler))
+    return logger
+
+
+def _connect() -> mysql.connector.connection.MySQLConnection:
+    """
+    Open a connection with the PERSONAL_DATA_DB_* environment variables.
+
+    Returns:
+        mysql.connector.connection.MySQLConnection: A MySQL connection object.
+
+    Raises:
+        mysql.connector.Error: If the connection fails.
+    """
+    return mysql.connector.connect(
+        user=os.getenv('PERSONAL_DATA_DB_USERNAME', 'root'),
+        password=os.getenv('PERSONAL_DATA_DB_PASSWORD', ''),
+        host=os.getenv('PERSONAL_DATA_DB_HOST', 'localhost'),
+        database=os.getenv('PERSONAL_DATA_DB_NAME'),
+        connection_timeout=int(
+            os.getenv('PERSONAL_DATA_DB_CONNECT_TIMEOUT', '10'))
+    )
 
 
 def get_db() -> Optional[mysql.connector.connection.MySQLConnection]:
@@ -12,13 +341,208 @@ def get_db() -> Optional[mysql.connector.connection.MySQLConnection]:
         mysql.connector.connection.MySQLConnection: A MySQL connection object.
     """
     try:
-        connection = mysql.connector.connect(
-            user=os.getenv('PERSONAL_DATA_DB_USERNAME', 'root'),
-            password=os.getenv('PERSONAL_DATA_DB_PASSWORD', ''),
-            host=os.getenv('PERSONAL_DATA_DB_HOST', 'localhost'),
-            database=os.getenv('PERSONAL_DATA_DB_NAME')
-        )
-        return connection
+        return _connect()
     except mysql.connector.Error as err:
         print(f"Error: {err}")
         return None
+
+
+class ConnectionPool:
+    """
+    Pool of database connections reused across calls. At most `size`
+    connections are open; a borrowed connection is pinged first (and
+    replaced if dead) and reopened once older than `recycle` seconds.
+    """
+
+    def __init__(self, size: int = None, timeout: float = None,
+                 recycle: float = None,
+                 connect: Callable[[], Any] = _connect) -> None:
+        """
+        Initialize the pool; connections are opened on demand.
+
+        Args:
+            size (int): Maximum open connections,
+                PERSONAL_DATA_DB_POOL_SIZE or 5 by default.
+            timeout (float): Seconds to wait for a free connection,
+                PERSONAL_DATA_DB_POOL_TIMEOUT or 30 by default.
+            recycle (float): Age in seconds after which a connection is
+                reopened, PERSONAL_DATA_DB_POOL_RECYCLE or 3600 by
+                default (0 never recycles).
+            connect (Callable[[], Any]): Opens a new connection.
+        """
+        if size is None:
+            size = int(os.getenv('PERSONAL_DATA_DB_POOL_SIZE', '5'))
+        if timeout is None:
+            timeout = float(os.getenv('PERSONAL_DATA_DB_POOL_TIMEOUT', '30'))
+        if recycle is None:
+            recycle = float(os.getenv('PERSONAL_DATA_DB_POOL_RECYCLE',
+                                      '3600'))
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._connect = connect
+        self._cond = threading.Condition()
+        self._idle = []
+        self._opened_at = {}
+        self._in_use = 0
+        self._counters = {"opened": 0, "reused": 0, "recycled": 0,
+                          "reconnected": 0, "waited": 0, "timed_out": 0}
+
+    def _open(self) -> Any:
+        """
+        Open a new connection and record when.
+        """
+        connection = self._connect()
+        self._opened_at[id(connection)] = time.monotonic()
+        with self._cond:
+            self._counters["opened"] += 1
+        return connection
+
+    def _discard(self, connection: Any) -> None:
+        """
+        Close a connection, ignoring errors of a dead one.
+        """
+        self._opened_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _checked(self, connection: Any) -> Any:
+        """
+        Return a healthy connection: the idle one if it is young enough
+        and answers a ping, otherwise a new one.
+        """
+        age = time.monotonic() - self._opened_at[id(connection)]
+        if self.recycle and age > self.recycle:
+            counter = "recycled"
+        else:
+            try:
+                connection.ping(reconnect=False)
+                counter = "reused"
+            except mysql.connector.Error:
+                counter = "reconnected"
+        with self._cond:
+            self._counters[counter] += 1
+        if counter == "reused":
+            return connection
+        self._discard(connection)
+        return self._open()
+
+    def acquire(self) -> Any:
+        """
+        Borrow a connection, waiting up to `timeout` seconds for one.
+
+        Returns:
+            Any: The connection; give it back with release().
+
+        Raises:
+            mysql.connector.errors.PoolError: If none is free in time.
+            mysql.connector.Error: If a new connection fails.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            if not self._idle and self._in_use >= self.size:
+                self._counters["waited"] += 1
+            while not self._idle and self._in_use >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timed_out"] += 1
+                    raise mysql.connector.errors.PoolError(
+                        "No connection free after {}s".format(self.timeout))
+                self._cond.wait(remaining)
+            self._in_use += 1
+            connection = self._idle.pop() if self._idle else None
+        try:
+            if connection is None:
+                return self._open()
+            return self._checked(connection)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, connection: Any) -> None:
+        """
+        Give a borrowed connection back, rolling back any transaction
+        left open.
+
+        Args:
+            connection (Any): The connection from acquire().
+        """
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except mysql.connector.Error:
+            self._discard(connection)
+            connection = None
+        with self._cond:
+            self._in_use -= 1
+            if connection is not None:
+                self._idle.append(connection)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Borrow a connection for the duration of a with block.
+
+        Returns:
+            Iterator[Any]: The connection, returned to the pool on exit.
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the pool usage: connections in use and idle, and how
+        borrows were served.
+        """
+        with self._cond:
+            return dict(self._counters, size=self.size,
+                        in_use=self._in_use, idle=len(self._idle))
+
+    def close(self) -> None:
+        """
+        Close the idle connections.
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._discard(connection)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Return the process-wide connection pool, created on first use.
+
+    Returns:
+        ConnectionPool: The pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+@contextmanager
+def pooled_db() -> Iterator[mysql.connector.connection.MySQLConnection]:
+    """
+    Borrow a connection of the shared pool, pooled counterpart of
+    get_db(): use `with pooled_db() as db:` instead of closing it.
+
+    Returns:
+        Iterator[MySQLConnection]: The connection, returned to the pool
+            on exit.
+    """
+    with get_pool().connection() as connection:
+        yield connection
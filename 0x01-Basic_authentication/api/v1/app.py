@@ -1,12 +1,54 @@
 #!/usr/bin/env python3
 """Flask app module to handle API requests and errors."""
 
-from flask import Flask, jsonify
-from api.v1.views import app_views
+from os import getenv
+from flask import Flask, abort, jsonify, request
+
+metrics = None
+if getenv("METRICS_ENABLED", "0") == "1":
+    # before the views import, which loads the users from file
+    from instrumentation import Metrics
+    from models.base import Base
+    metrics = Metrics()
+    metrics.instrument_method(Base, "save_to_file",
+                              "base_file_duration_seconds", op="save")
+    metrics.instrument_method(Base, "load_from_file",
+                              "base_file_duration_seconds", op="load")
+
+from api.v1.views import app_views  # noqa: E402
 
 app = Flask(__name__)
 app.register_blueprint(app_views)
 
+auth = None
+AUTH_TYPE = getenv("AUTH_TYPE")
+if AUTH_TYPE == "basic_auth":
+    from api.v1.auth.basic_auth import BasicAuth
+    auth = BasicAuth()
+elif AUTH_TYPE == "auth":
+    from api.v1.auth.auth import Auth
+    auth = Auth()
+
+EXCLUDED_PATHS = ['/api/v1/status/', '/api/v1/unauthorized/',
+                  '/api/v1/forbidden/']
+
+if metrics is not None:
+    metrics.init_flask(app)
+    EXCLUDED_PATHS.append('/metrics')
+
+
+@app.before_request
+def authenticate() -> None:
+    """Require valid credentials on every non excluded path."""
+    if auth is None:
+        return
+    if not auth.require_auth(request.path, EXCLUDED_PATHS):
+        return
+    if auth.authorization_header(request) is None:
+        abort(401)
+    if auth.current_user(request) is None:
+        abort(403)
+
 
 @app.errorhandler(401)
 def unauthorized_error(error):
@@ -14,5 +56,11 @@ def unauthorized_error(error):
     return jsonify({"error": "Unauthorized"}), 401
 
 
+@app.errorhandler(403)
+def forbidden_error(error):
+    """Handle 403 Forbidden error."""
+    return jsonify({"error": "Forbidden"}), 403
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
@@ -3,10 +3,32 @@
 Auth module for managing API authentication.
 """
 
-from typing import List, TypeVar
+import re
+from functools import lru_cache
+from typing import List, Pattern, Tuple, TypeVar
 from flask import request
 
 
+@lru_cache(maxsize=32)
+def compile_excluded_paths(excluded_paths: Tuple[str, ...]) -> Pattern:
+    """
+    Compiles a list of excluded paths into one regular expression.
+    Trailing slashes are optional and a '*' matches any characters.
+
+    Args:
+    excluded_paths (Tuple[str, ...]): The paths excluded
+    from authentication.
+
+    Returns:
+        Pattern: The compiled matcher.
+    """
+    patterns = []
+    for excluded in excluded_paths:
+        excluded = excluded.rstrip('/')
+        patterns.append(re.escape(excluded).replace(r'\*', '.*'))
+    return re.compile("(?:{})/?".format("|".join(patterns)))
+
+
 class Auth:
     """
     Auth class for handling authentication related methods.
@@ -15,7 +37,6 @@ class Auth:
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """
         Determines if authentication is required.
-        Currently returns False for all paths.
 
         Args:
         path (str): The path to check.
@@ -23,23 +44,28 @@ class Auth:
         from authentication.
 
         Returns:
-            bool: False as the default implementation.
+            bool: False if the path matches an excluded path,
+            True otherwise.
         """
-        return False
+        if path is None or not excluded_paths:
+            return True
+        matcher = compile_excluded_paths(tuple(excluded_paths))
+        return matcher.fullmatch(path) is None
 
     def authorization_header(self, request=None) -> str:
         """
         Returns the authorization header from the request.
-        Currently returns None.
 
         Args:
         request (Request, optional): The Flask request object.
         Defaults to None.
 
         Returns:
-            str: None as the default implementation.
+            str: The Authorization header value, or None.
         """
-        return None
+        if request is None:
+            return None
+        return request.headers.get('Authorization')
 
     def current_user(self, request=None) -> TypeVar('User'):
         """
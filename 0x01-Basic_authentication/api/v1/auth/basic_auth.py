@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+BasicAuth module for HTTP Basic authentication of the API.
+"""
+
+import base64
+import binascii
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from os import getenv
+from typing import Optional, Tuple, TypeVar
+from api.v1.auth.auth import Auth
+from models.user import User
+
+
+class CredentialCache:
+    """
+    Bounded LRU cache of verified credentials with a time to live.
+    Entries are keyed by a digest of the Authorization header and
+    remember the password hash they were verified against, so a
+    password change or a removed user makes them miss.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300) -> None:
+        """
+        Initialize an empty cache.
+
+        Args:
+        max_size (int): The maximum number of entries.
+        ttl (float): The lifetime of an entry in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(header: str) -> bytes:
+        """
+        Returns the cache key of an Authorization header.
+
+        Args:
+        header (str): The Authorization header value.
+
+        Returns:
+            bytes: A SHA-256 digest of the header.
+        """
+        return hashlib.sha256(header.encode('utf-8')).digest()
+
+    def get(self, header: str) -> Optional[TypeVar('User')]:
+        """
+        Returns the user previously verified for a header.
+
+        Args:
+        header (str): The Authorization header value.
+
+        Returns:
+            User: The user, or None if not cached or no longer valid.
+        """
+        key = self.key(header)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, pwd_hash, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        user = User.get(user_id)
+        if user is None or user.password != pwd_hash:
+            self.discard(header)
+            return None
+        return user
+
+    def put(self, header: str, user: TypeVar('User')) -> None:
+        """
+        Caches the user verified for a header.
+
+        Args:
+        header (str): The Authorization header value.
+        user (User): The verified user.
+        """
+        key = self.key(header)
+        entry = (user.id, user.password, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, header: str) -> None:
+        """
+        Removes the entry of a header.
+
+        Args:
+        header (str): The Authorization header value.
+        """
+        with self._lock:
+            self._entries.pop(self.key(header), None)
+
+    def clear(self) -> None:
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class BasicAuth(Auth):
+    """
+    BasicAuth class authenticating users with the Basic scheme.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the instance and its credential cache.
+        """
+        self.cache = CredentialCache(
+            int(getenv('AUTH_CACHE_SIZE', '1024')),
+            float(getenv('AUTH_CACHE_TTL', '300')))
+
+    def extract_base64_authorization_header(
+            self, authorization_header: str) -> str:
+        """
+        Returns the Base64 part of a Basic Authorization header.
+
+        Args:
+        authorization_header (str): The Authorization header value.
+
+        Returns:
+            str: The Base64 credentials, or None.
+        """
+        if type(authorization_header) is not str:
+            return None
+        if not authorization_header.startswith("Basic "):
+            return None
+        return authorization_header[len("Basic "):]
+
+    def decode_base64_authorization_header(
+            self, base64_authorization_header: str) -> str:
+        """
+        Decodes Base64 credentials.
+
+        Args:
+        base64_authorization_header (str): The Base64 credentials.
+
+        Returns:
+            str: The decoded UTF-8 string, or None if invalid.
+        """
+        if type(base64_authorization_header) is not str:
+            return None
+        try:
+            decoded = base64.b64decode(base64_authorization_header,
+                                       validate=True)
+            return decoded.decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError):
+            return None
+
+    def extract_user_credentials(
+            self, decoded_base64_authorization_header: str
+    ) -> Tuple[str, str]:
+        """
+        Splits decoded credentials into email and password.
+
+        Args:
+        decoded_base64_authorization_header (str): "email:password".
+
+        Returns:
+            Tuple[str, str]: The email and password, or (None, None).
+        """
+        decoded = decoded_base64_authorization_header
+        if type(decoded) is not str or ':' not in decoded:
+            return None, None
+        email, pwd = decoded.split(':', 1)
+        return email, pwd
+
+    def user_object_from_credentials(
+            self, user_email: str, user_pwd: str) -> TypeVar('User'):
+        """
+        Returns the user matching an email and password, upgrading
+        a legacy password hash after a successful check.
+
+        Args:
+        user_email (str): The email of the user.
+        user_pwd (str): The password of the user.
+
+        Returns:
+            User: The user, or None if the credentials are invalid.
+        """
+        if type(user_email) is not str or type(user_pwd) is not str:
+            return None
+        try:
+            users = User.search({'email': user_email})
+        except Exception:
+            return None
+        for user in users:
+            if user.is_valid_password(user_pwd):
+                if user.password_needs_rehash():
+                    user.password = user_pwd
+                    user.save()
+                return user
+        return None
+
+    def current_user(self, request=None) -> TypeVar('User'):
+        """
+        Returns the user authenticated by the request, using the
+        credential cache before decoding and verifying the header.
+
+        Args:
+        request (Request, optional): The Flask request object.
+        Defaults to None.
+
+        Returns:
+            TypeVar('User'): The authenticated user, or None.
+        """
+        header = self.authorization_header(request)
+        if header is None:
+            return None
+        user = self.cache.get(header)
+        if user is not None:
+            return user
+        b64 = self.extract_base64_authorization_header(header)
+        decoded = self.decode_base64_authorization_header(b64)
+        email, pwd = self.extract_user_credentials(decoded)
+        user = self.user_object_from_credentials(email, pwd)
+        if user is not None:
+            self.cache.put(header, user)
+        return user
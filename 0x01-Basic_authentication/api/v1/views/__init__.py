@@ -3,7 +3,11 @@
 """
 
 from flask import Blueprint
-from api.v1.views.index import *
-from api.v1.views.users import *
 
 app_views = Blueprint("app_views", __name__, url_prefix="/api/v1")
+
+from api.v1.views.index import *  # noqa: E402
+from api.v1.views.users import *  # noqa: E402
+from models.user import User  # noqa: E402
+
+User.load_from_file()
@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 """Module defining index routes for the API."""
 
-from flask import abort, Blueprint
+from flask import abort
+from api.v1.views import app_views
 
-app_views = Blueprint('app_views', __name__)
 
-
-@app_views.route('/api/v1/unauthorized', methods=['GET'])
+@app_views.route('/unauthorized', methods=['GET'])
 def unauthorized():
     """Endpoint that triggers a 401 Unauthorized error."""
     abort(401)
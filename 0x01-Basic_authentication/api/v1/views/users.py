@@ -1,19 +1,65 @@
 #!/usr/bin/env python3
 """ Module of Users views
 """
+from os import getenv
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import abort, jsonify, request, Response
+from models import hashers
 from models.user import User
 
+# each password costs a full PBKDF2 hash (~40 ms of CPU at the default
+# 100k iterations): a batch of 1000 takes ~40 s on one core
+BATCH_MAX_USERS = int(getenv('USER_BATCH_MAX', '1000'))
+
+
+def stream_users():
+    """ Generate the JSON array of all users chunk by chunk
+    """
+    yield b"["
+    first = True
+    # a copy: the live list changes as users are created or removed
+    for user_id in list(User.ordered_ids()):
+        user = User.get(user_id)
+        if user is None:
+            continue
+        if not first:
+            yield b", "
+        first = False
+        yield user.to_json_bytes()
+    yield b"]"
+
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters:
+      - limit (optional): max number of users to return
+      - cursor (optional): ID of the last user of the previous page
+      - stream (optional): 1 to stream the full list incrementally
     Return:
       - list of all User objects JSON represented
+      - with limit: one page ordered by ID, and the next cursor in
+        the X-Next-Cursor header (absent on the last page)
+      - 400 if limit isn't a positive integer
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    limit = request.args.get('limit')
+    if limit is None:
+        if request.args.get('stream') in ('1', 'true'):
+            return Response(stream_users(), mimetype='application/json')
+        return Response(User.bulk_to_json(User.all()),
+                        mimetype='application/json')
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return jsonify({'error': "limit must be a positive integer"}), 400
+    users, next_cursor = User.page(limit, request.args.get('cursor'))
+    response = Response(User.bulk_to_json(users),
+                        mimetype='application/json')
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -73,6 +119,8 @@ def create_user() -> str:
         error_msg = "Wrong format"
     if error_msg is None and rj.get("email", "") == "":
         error_msg = "email missing"
+    if error_msg is None and type(rj.get("email")) is not str:
+        error_msg = "email must be a string"
     if error_msg is None and rj.get("password", "") == "":
         error_msg = "password missing"
     if error_msg is None:
@@ -89,6 +137,73 @@ def create_user() -> str:
     return jsonify({'error': error_msg}), 400
 
 
+@app_views.route('/users/batch', methods=['POST'], strict_slashes=False)
+def create_users_batch() -> str:
+    """ POST /api/v1/users/batch
+    JSON body:
+      - list of objects with the fields of POST /api/v1/users
+    Passwords are hashed in parallel (USER_PASSWORD_HASH_WORKERS
+    threads), but each still costs a full PBKDF2 hash: batches are
+    capped at USER_BATCH_MAX items (1000 by default)
+    Return:
+      - created: list of the created User objects JSON represented
+      - errors: list of {index, error} for the items not created
+      - 201 if at least one User has been created, 400 otherwise
+      - 413 if the batch has more than USER_BATCH_MAX items
+    """
+    rj = None
+    try:
+        rj = request.get_json()
+    except Exception as e:
+        rj = None
+    if type(rj) is not list:
+        return jsonify({'error': "Wrong format"}), 400
+    if len(rj) > BATCH_MAX_USERS:
+        return jsonify({'error': "At most {} users per batch".format(
+            BATCH_MAX_USERS)}), 413
+    users = []
+    passwords = []
+    errors = []
+    for index, item in enumerate(rj):
+        error_msg = None
+        if type(item) is not dict:
+            error_msg = "Wrong format"
+        if error_msg is None and item.get("email", "") == "":
+            error_msg = "email missing"
+        if error_msg is None and type(item.get("email")) is not str:
+            error_msg = "email must be a string"
+        if error_msg is None and item.get("password", "") == "":
+            error_msg = "password missing"
+        if error_msg is None and type(item.get("password")) is not str:
+            error_msg = "password must be a string"
+        if error_msg is None and any(
+                type(item.get(key)) not in (str, type(None))
+                for key in ("first_name", "last_name")):
+            error_msg = "first_name and last_name must be strings"
+        if error_msg is None:
+            try:
+                user = User()
+                user.email = item.get("email")
+                user.first_name = item.get("first_name")
+                user.last_name = item.get("last_name")
+                users.append(user)
+                passwords.append(item.get("password"))
+                continue
+            except Exception as e:
+                error_msg = "Can't create User: {}".format(e)
+        errors.append({'index': index, 'error': error_msg})
+    try:
+        for user, encoded in zip(users, hashers.make_passwords(passwords)):
+            user._password = encoded
+        # all or nothing: on failure no User of the batch is kept
+        User.save_many(users)
+    except Exception as e:
+        return jsonify({'error': "Can't create Users: {}".format(e)}), 400
+    status = 201 if len(users) > 0 else 400
+    return jsonify({'created': [user.to_json() for user in users],
+                    'errors': errors}), status
+
+
 @app_views.route('/users/<user_id>', methods=['PUT'], strict_slashes=False)
 def update_user(user_id: str = None) -> str:
     """ PUT /api/v1/users/:id
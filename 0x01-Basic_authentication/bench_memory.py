@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+""" Memory benchmark: bytes per User with the default and the compact
+(BASE_COMPACT_MODELS=1) representation
+Usage: ./bench_memory.py [size]   (default: 100000)
+"""
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+
+def measure(size: int) -> float:
+    """ Return the traced bytes per user for `size` users in DATA
+    """
+    from models.base import DATA
+    from models.user import User
+    from models.hashers import make_password
+
+    first_names = ["Bob", "Alice", "Eve", "Mallory", "Trent"]
+    DATA['User'] = {}
+    password = make_password("secret")
+    tracemalloc.start()
+    for i in range(size):
+        # decoded like a record of .db_User.json: no shared strings
+        user = User(**json.loads(json.dumps({
+            'email': "user{}@example.com".format(i),
+            'first_name': first_names[i % 5],
+            'last_name': "Dylan",
+            '_password': password,
+            'created_at': "2024-08-17T10:00:00",
+            'updated_at': "2024-08-17T10:00:00"})))
+        DATA['User'][user.id] = user
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / size
+
+
+if __name__ == "__main__":
+    if os.getenv('BENCH_MEMORY_CHILD'):
+        print("{:.1f}".format(measure(int(sys.argv[1]))))
+        sys.exit(0)
+    size = sys.argv[1] if len(sys.argv) > 1 else "100000"
+    for compact in ("0", "1"):
+        env = dict(os.environ, BENCH_MEMORY_CHILD="1",
+                   BASE_COMPACT_MODELS=compact)
+        out = subprocess.run([sys.executable, __file__, size], env=env,
+                             stdout=subprocess.PIPE, check=True)
+        print("{:>8} users, compact={}: {} bytes/user".format(
+            size, compact, out.stdout.decode().strip()))
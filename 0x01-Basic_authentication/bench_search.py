@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+""" Benchmark of User.search by email with and without the hash index
+Usage: ./bench_search.py [size ...]   (default: 1000 100000 1000000)
+"""
+import sys
+import time
+from models.base import DATA, INDEXES
+from models.user import User
+
+
+def populate(size: int) -> None:
+    """ Fill the in-memory store with `size` users (no file I/O)
+    """
+    DATA['User'] = {}
+    for i in range(size):
+        user = User(email="user{}@example.com".format(i))
+        DATA['User'][user.id] = user
+    User.rebuild_indexes()
+
+
+def lookup_latency(size: int, rounds: int) -> float:
+    """ Return the mean latency in microseconds of an email lookup
+    """
+    start = time.perf_counter()
+    for i in range(rounds):
+        email = "user{}@example.com".format((i * 7919) % size)
+        User.search({'email': email})
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 100000, 1000000]
+    for size in sizes:
+        populate(size)
+        indexed = lookup_latency(size, 1000)
+        User.indexed_fields = ()
+        INDEXES.pop('User', None)
+        scan = lookup_latency(size, 3 if size > 10000 else 100)
+        User.indexed_fields = ('email',)
+        print("{:>8} users: scan {:>12.1f} us  indexed {:>8.1f} us".format(
+            size, scan, indexed))
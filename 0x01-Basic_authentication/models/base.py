@@ -2,20 +2,192 @@
 """ Base module
 """
 from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import MutableMapping
+from typing import TypeVar, List, Iterable, Iterator, Optional, Tuple
+from os import path, getenv
+import atexit
 import json
+import mmap
+import os
+import threading
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+JOURNAL_MODE = getenv('BASE_JOURNAL_MODE', '0') in ('1', 'true', 'yes')
+JOURNAL_COMPACT_EVERY = int(getenv('BASE_JOURNAL_COMPACT_EVERY', '1000'))
+JOURNAL_SIZES = {}
+INDEXES = {}
+# index key of the values that can't be hashed (lists, dicts...): a
+# search on such a field always also filters these objects
+UNHASHABLE = object()
+ORDERED_IDS = {}
+LAZY_LOAD = getenv('BASE_LAZY_LOAD', '0') in ('1', 'true', 'yes')
+COMPACT_MODELS = getenv('BASE_COMPACT_MODELS', '0') in ('1', 'true', 'yes')
+SLOT_NAMES = {}
+# sync: write on every mutation, fsync: same and fsync the files,
+# batched: a background thread writes pending mutations as one group
+DURABILITY = getenv('BASE_DURABILITY', 'sync')
+FLUSH_INTERVAL_MS = int(getenv('BASE_FLUSH_INTERVAL_MS', '50'))
+FLUSH_MAX_MUTATIONS = int(getenv('BASE_FLUSH_MAX_MUTATIONS', '500'))
+# STORE_LOCK guards DATA and PENDING (and snapshot writes unless
+# batched); FLUSH_LOCK keeps batched groups and snapshot writes in order
+# and is always taken before STORE_LOCK
+STORE_LOCK = threading.RLock()
+FLUSH_LOCK = threading.RLock()
+PENDING = {}
+FLUSH_EVENT = threading.Event()
+FLUSHER = []
+
+
+def _sync_file(f):
+    """ Force the content of an open file to disk in fsync durability
+    """
+    if DURABILITY == 'fsync':
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _sync_dir():
+    """ Make renames, creations and removals of files in the working
+    directory durable in fsync durability
+    """
+    if DURABILITY == 'fsync':
+        fd = os.open('.', os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _run_flusher():
+    """ Background loop of the batched durability mode
+    """
+    while True:
+        FLUSH_EVENT.wait(FLUSH_INTERVAL_MS / 1000)
+        FLUSH_EVENT.clear()
+        Base.flush()
+
+
+class LazyObjects(MutableMapping):
+    """ Dict-like store of the objects of one class, backed by a
+    memory-mapped snapshot and its offset index: an object is only
+    built from its JSON slice the first time it is accessed
+    """
+
+    def __init__(self, cls: type, mapped: mmap.mmap, offsets: dict):
+        """ Initialize the store from a mapped file and {id: [start, end]}
+        """
+        self._cls = cls
+        self._mapped = mapped
+        self._offsets = offsets
+        self._loaded = {}
+
+    def raw(self, obj_id: str) -> Optional[bytes]:
+        """ Return the JSON bytes of a not yet hydrated object, or None
+        """
+        if obj_id in self._loaded or obj_id not in self._offsets:
+            return None
+        start, end = self._offsets[obj_id]
+        return self._mapped[start:end]
+
+    def entries(self) -> Iterator[Tuple[str, Optional[bytes], object]]:
+        """ Return an iterator of (id, raw JSON or None, object or None)
+        over a copy of the store, taken in O(1) Python steps so it can
+        be made under a lock and consumed after it is released
+        """
+        mapped = self._mapped
+        offsets = dict(self._offsets)
+        loaded = dict(self._loaded)
+
+        def _entries():
+            """ Yield the copied entries, mapped ones first
+            """
+            for obj_id, (start, end) in offsets.items():
+                obj = loaded.get(obj_id)
+                if obj is None:
+                    yield obj_id, mapped[start:end], None
+                else:
+                    yield obj_id, None, obj
+            for obj_id, obj in loaded.items():
+                if obj_id not in offsets:
+                    yield obj_id, None, obj
+        return _entries()
+
+    def __getitem__(self, obj_id: str):
+        """ Return an object, hydrating it on first access
+        """
+        obj = self._loaded.get(obj_id)
+        if obj is not None:
+            return obj
+        start, end = self._offsets[obj_id]
+        obj = self._cls(**json.loads(self._mapped[start:end]))
+        self._loaded[obj_id] = obj
+        return obj
+
+    def __setitem__(self, obj_id: str, obj):
+        """ Store an object
+        """
+        self._loaded[obj_id] = obj
+
+    def __delitem__(self, obj_id: str):
+        """ Remove an object, hydrated or not
+        """
+        found = self._loaded.pop(obj_id, None) is not None
+        found = self._offsets.pop(obj_id, None) is not None or found
+        if not found:
+            raise KeyError(obj_id)
+
+    def __contains__(self, obj_id) -> bool:
+        """ Check an ID without hydrating the object
+        """
+        return obj_id in self._loaded or obj_id in self._offsets
+
+    def __iter__(self) -> Iterator[str]:
+        """ Iterate over all IDs
+        """
+        for obj_id in self._offsets:
+            yield obj_id
+        for obj_id in self._loaded:
+            if obj_id not in self._offsets:
+                yield obj_id
+
+    def __len__(self) -> int:
+        """ Count objects without hydrating them
+        """
+        extra = sum(1 for k in self._loaded if k not in self._offsets)
+        return len(self._offsets) + extra
+
+
+def _format_timestamp(value: datetime) -> str:
+    """ Format a naive datetime with TIMESTAMP_FORMAT
+    (isoformat gives the same text, several times faster than strftime)
+    """
+    if value.tzinfo is None:
+        return value.isoformat(timespec='seconds')
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string
+    """
+    if len(value) == 19:
+        return datetime.fromisoformat(value)
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
 
 
 class Base():
     """ Base class
     """
 
+    # subclasses that also define __slots__ have no per-instance __dict__
+    __slots__ = ('id', 'created_at', 'updated_at', '_json_cache')
+
+    # attribute names kept in a value -> ids hash index for search()
+    indexed_fields = ()
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
@@ -25,13 +197,11 @@ class Base():
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = _parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = _parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
@@ -44,62 +214,432 @@ class Base():
             return False
         return (self.id == other.id)
 
+    def __setattr__(self, name: str, value: object):
+        """ Set an attribute and invalidate the serialization cache
+        """
+        object.__setattr__(self, name, value)
+        if name != '_json_cache':
+            object.__setattr__(self, '_json_cache', None)
+
+    def _json_cached(self) -> list:
+        """ Return the serialization cache of the object:
+        [public dict, full dict, public bytes, full bytes]
+        It is rebuilt after any attribute assignment (in-place changes
+        of mutable attribute values aren't detected)
+        """
+        cache = getattr(self, '_json_cache', None)
+        if cache is None:
+            full = {}
+            for key, value in self._attributes():
+                if type(value) is datetime:
+                    full[key] = _format_timestamp(value)
+                else:
+                    full[key] = value
+            public = {k: v for k, v in full.items() if k[0] != '_'}
+            cache = [public, full, None, None]
+            object.__setattr__(self, '_json_cache', cache)
+        return cache
+
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
-        result = {}
-        for key, value in self.__dict__.items():
-            if not for_serialization and key[0] == '_':
+        return dict(self._json_cached()[1 if for_serialization else 0])
+
+    def to_json_bytes(self, for_serialization: bool = False) -> bytes:
+        """ Return the JSON encoding of to_json() (cached)
+        """
+        cache = self._json_cached()
+        i = 3 if for_serialization else 2
+        if cache[i] is None:
+            cache[i] = json.dumps(cache[i - 2]).encode()
+        return cache[i]
+
+    @staticmethod
+    def bulk_to_json(objs: Iterable[TypeVar('Base')],
+                     for_serialization: bool = False) -> bytes:
+        """ Encode a sequence of objects as one JSON array in one pass
+        """
+        return b"[" + b", ".join(
+            obj.to_json_bytes(for_serialization) for obj in objs) + b"]"
+
+    @classmethod
+    def _slot_names(cls) -> Tuple[str, ...]:
+        """ Return the names of all slots of the class, base class first
+        """
+        names = SLOT_NAMES.get(cls)
+        if names is None:
+            names = []
+            for klass in reversed(cls.__mro__):
+                slots = klass.__dict__.get('__slots__', ())
+                if isinstance(slots, str):
+                    slots = (slots,)
+                names.extend(n for n in slots
+                             if n not in ('__dict__', '__weakref__'))
+            names = tuple(names)
+            SLOT_NAMES[cls] = names
+        return names
+
+    def _attributes(self) -> Iterator[Tuple[str, object]]:
+        """ Iterate over (name, value) of all set instance attributes
+        """
+        for key in self._slot_names():
+            if key == '_json_cache':
                 continue
-            if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
-            else:
-                result[key] = value
-        return result
+            try:
+                yield key, getattr(self, key)
+            except AttributeError:
+                continue
+        yield from getattr(self, '__dict__', {}).items()
 
     @classmethod
     def load_from_file(cls):
-        """ Load all objects from file
+        """ Load all objects from file, then replay the journal on top
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
+        if DURABILITY == 'batched':
+            # queued mutations would otherwise be written over the
+            # reloaded objects, or lost
+            Base.flush()
         DATA[s_class] = {}
-        if not path.exists(file_path):
+        if LAZY_LOAD and cls.load_lazily():
+            pass
+        elif path.exists(file_path):
+            with open(file_path, 'r') as f:
+                objs_json = json.load(f)
+                for obj_id, obj_json in objs_json.items():
+                    DATA[s_class][obj_id] = cls(**obj_json)
+        # indexes are rebuilt on the first indexed search
+        INDEXES.pop(s_class, None)
+        ORDERED_IDS.pop(s_class, None)
+        rotated = path.exists(".db_{}.journal.old".format(s_class))
+        JOURNAL_SIZES[s_class] = cls.replay_journal()
+        if JOURNAL_SIZES[s_class] < 0 or rotated:
+            # compact so later appends don't land after a torn record,
+            # and to finish a snapshot interrupted by a crash
+            cls.save_to_file()
+
+    @classmethod
+    def load_lazily(cls) -> bool:
+        """ Map the snapshot in memory using its offset index
+        Return False if there is no usable index for the snapshot
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        index_path = ".db_{}.idx".format(s_class)
+        if not path.exists(file_path) or not path.exists(index_path):
+            return False
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        stat = os.stat(file_path)
+        if index.get('size') != stat.st_size \
+                or index.get('mtime_ns') != stat.st_mtime_ns:
+            return False
+        with open(file_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        DATA[s_class] = LazyObjects(cls, mapped, index.get('offsets'))
+        return True
+
+    @classmethod
+    def rebuild_indexes(cls):
+        """ Rebuild the secondary indexes of the class from DATA
+        Objects of a lazy store are indexed from their raw JSON
+        without being hydrated
+        """
+        s_class = cls.__name__
+        INDEXES[s_class] = {'by_id': {}}
+        for field in cls.indexed_fields:
+            INDEXES[s_class][field] = {}
+        objs = DATA.get(s_class, {})
+        raw = getattr(objs, 'raw', lambda obj_id: None)
+        for obj_id in list(objs.keys()):
+            obj_bytes = raw(obj_id)
+            if obj_bytes is None:
+                objs[obj_id]._index_add()
+            else:
+                obj_json = json.loads(obj_bytes)
+                cls._index_put(s_class, obj_id, {
+                    field: obj_json.get(field)
+                    for field in cls.indexed_fields})
+
+    @staticmethod
+    def _index_key(value: object) -> object:
+        """ Return the index key of a value: itself, or UNHASHABLE
+        """
+        try:
+            hash(value)
+        except TypeError:
+            return UNHASHABLE
+        return value
+
+    @staticmethod
+    def _index_put(s_class: str, obj_id: str, values: dict):
+        """ Record the indexed attribute values of one object
+        """
+        keys = {field: Base._index_key(value)
+                for field, value in values.items()}
+        for field, key in keys.items():
+            INDEXES[s_class][field].setdefault(key, set()).add(obj_id)
+        INDEXES[s_class]['by_id'][obj_id] = keys
+
+    def _index_add(self):
+        """ Add the current object to the secondary indexes of its class
+        """
+        if not self.indexed_fields:
+            return
+        s_class = self.__class__.__name__
+        if s_class not in INDEXES:
+            # not built yet, rebuild_indexes() will pick the object up
             return
+        self._index_discard()
+        self._index_put(s_class, self.id, {
+            field: getattr(self, field, None)
+            for field in self.indexed_fields})
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    def _index_discard(self):
+        """ Remove the current object from the secondary indexes
+        """
+        indexes = INDEXES.get(self.__class__.__name__)
+        if indexes is None:
+            return
+        values = indexes['by_id'].pop(self.id, None)
+        if values is None:
+            return
+        for field, value in values.items():
+            ids = indexes[field].get(value)
+            if ids is not None:
+                ids.discard(self.id)
+                if len(ids) == 0:
+                    del indexes[field][value]
+
+    @classmethod
+    def replay_journal(cls) -> int:
+        """ Apply every complete record of the journal to DATA (first
+        the one rotated out by an unfinished snapshot, if any) and
+        return the number of records read (-1 if a tail is torn)
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        count = 0
+        torn = False
+        for file_path in ("{}.old".format(journal_path), journal_path):
+            if not path.exists(file_path):
+                continue
+            with open(file_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # torn write at the tail after a crash
+                        torn = True
+                        break
+                    if record.get('op') == 'save':
+                        obj_json = record.get('obj')
+                        DATA[s_class][obj_json['id']] = cls(**obj_json)
+                    elif record.get('op') == 'remove':
+                        DATA[s_class].pop(record.get('id'), None)
+                    count += 1
+        return -1 if torn else count
 
     @classmethod
     def save_to_file(cls):
-        """ Save all objects to file
+        """ Save all objects to file (snapshot) and reset the journal
+        The snapshot is a JSON object of {id: object}; with LAZY_LOAD,
+        the byte range of each object is written to .db_<Class>.idx
+        """
+        if DURABILITY == 'batched':
+            # STORE_LOCK is only held to copy the objects' bytes, so
+            # request threads don't wait for the disk
+            with FLUSH_LOCK:
+                cls._write_snapshot()
+        else:
+            with STORE_LOCK:
+                cls._write_snapshot()
+
+    @classmethod
+    def _rotate_journal(cls):
+        """ Move the journal aside: its records are all in the snapshot
+        being written, later ones go to a new journal
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        old_path = "{}.old".format(journal_path)
+        if path.exists(journal_path):
+            if path.exists(old_path):
+                # left by a failed snapshot: keep both, in order
+                with open(journal_path, 'rb') as src, \
+                        open(old_path, 'ab') as dst:
+                    dst.write(src.read())
+                    _sync_file(dst)
+                os.remove(journal_path)
+            else:
+                os.replace(journal_path, old_path)
+            _sync_dir()
+        JOURNAL_SIZES[s_class] = 0
+
+    @classmethod
+    def _write_snapshot(cls):
+        """ Write the snapshot (and its index if LAZY_LOAD), then drop
+        the journal
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        index_path = ".db_{}.idx".format(s_class)
+        offsets = {}
+        with STORE_LOCK:
+            # only copy the store under the lock: the objects are
+            # serialized while request threads carry on
+            objs = DATA[s_class]
+            if isinstance(objs, LazyObjects):
+                entries = objs.entries()
+            else:
+                entries = ((obj_id, None, obj)
+                           for obj_id, obj in list(objs.items()))
+            cls._rotate_journal()
+
+        tmp_path = "{}.tmp".format(file_path)
+        with open(tmp_path, 'wb') as f:
+            pos = f.write(b'{')
+            for obj_id, obj_bytes, obj in entries:
+                if obj_bytes is None:
+                    obj_bytes = obj.to_json_bytes(True)
+                prefix = json.dumps(obj_id).encode() + b': '
+                if pos > 1:
+                    prefix = b', ' + prefix
+                pos += f.write(prefix)
+                if LAZY_LOAD:
+                    offsets[obj_id] = [pos, pos + len(obj_bytes)]
+                pos += f.write(obj_bytes)
+            pos += f.write(b'}')
+            _sync_file(f)
+        os.replace(tmp_path, file_path)
+        _sync_dir()
+        if LAZY_LOAD:
+            # the index is only trusted if it matches the snapshot it was
+            # written for, so a crash between the two renames is harmless
+            mtime_ns = os.stat(file_path).st_mtime_ns
+            with open("{}.tmp".format(index_path), 'w') as f:
+                json.dump({'size': pos, 'mtime_ns': mtime_ns,
+                           'offsets': offsets}, f)
+            os.replace("{}.tmp".format(index_path), index_path)
+        elif path.exists(index_path):
+            # stale: lazy loading falls back to a full load without it
+            os.remove(index_path)
+
+        old_path = ".db_{}.journal.old".format(s_class)
+        if path.exists(old_path):
+            os.remove(old_path)
+            _sync_dir()
+
+    @classmethod
+    def append_to_journal(cls, records: List[dict]):
+        """ Append mutation records to the journal, compacting
+        into a snapshot every JOURNAL_COMPACT_EVERY records
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        created = not path.exists(journal_path)
+        with open(journal_path, 'a') as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+            _sync_file(f)
+        if created:
+            _sync_dir()
+        JOURNAL_SIZES[s_class] = JOURNAL_SIZES.get(s_class, 0) + len(records)
+        if JOURNAL_SIZES[s_class] >= JOURNAL_COMPACT_EVERY:
+            cls.save_to_file()
+
+    @classmethod
+    def _persist(cls, records: List[dict]):
+        """ Persist mutations according to the durability mode
+        """
+        if DURABILITY != 'batched':
+            if JOURNAL_MODE:
+                cls.append_to_journal(records)
+            else:
+                cls.save_to_file()
+            return
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+        with STORE_LOCK:
+            pending = PENDING.setdefault(cls.__name__, (cls, []))
+            pending[1].extend(records)
+            count = sum(len(records) for _, records in PENDING.values())
+            if len(FLUSHER) == 0:
+                flusher = threading.Thread(target=_run_flusher,
+                                           name="base-flusher", daemon=True)
+                FLUSHER.append(flusher)
+                flusher.start()
+        if count >= FLUSH_MAX_MUTATIONS:
+            FLUSH_EVENT.set()
+
+    @staticmethod
+    def flush():
+        """ Write all pending mutations of all classes to disk
+        (batched durability mode), as one group per class
+        """
+        with FLUSH_LOCK:
+            with STORE_LOCK:
+                pending = list(PENDING.values())
+                PENDING.clear()
+            for klass, records in pending:
+                if JOURNAL_MODE:
+                    klass.append_to_journal(records)
+                else:
+                    klass.save_to_file()
 
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        self.__class__.save_many([self])
+
+    @classmethod
+    def save_many(cls, objs: List[TypeVar('Base')]):
+        """ Save several objects of the class with a single write
+        All or nothing: the objects are serialized before any of them is
+        stored, and the store is restored if the write fails
+        """
+        if len(objs) == 0:
+            return
+        s_class = cls.__name__
+        now = datetime.utcnow()
+        records = []
+        for obj in objs:
+            obj.updated_at = now
+            # raises on values that can't be serialized, before any change
+            obj.to_json_bytes(True)
+            records.append({'op': 'save', 'obj': obj.to_json(True)})
+        with STORE_LOCK:
+            objs_store = DATA[s_class]
+            previous = {obj.id: objs_store.get(obj.id) for obj in objs}
+            for obj in objs:
+                if obj.id not in objs_store:
+                    cls._ordered_add(obj.id)
+                objs_store[obj.id] = obj
+                obj._index_add()
+            try:
+                cls._persist(records)
+            except BaseException:
+                for obj_id, old in previous.items():
+                    new = objs_store.pop(obj_id, None)
+                    if new is not None:
+                        new._index_discard()
+                    if old is not None:
+                        objs_store[obj_id] = old
+                        old._index_add()
+                    else:
+                        cls._ordered_discard(obj_id)
+                raise
 
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
+        with STORE_LOCK:
+            if DATA[s_class].get(self.id) is None:
+                return
             del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+            self.__class__._ordered_discard(self.id)
+            self._index_discard()
+            self.__class__._persist([{'op': 'remove', 'id': self.id}])
 
     @classmethod
     def count(cls) -> int:
@@ -114,6 +654,59 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def ordered_ids(cls) -> List[str]:
+        """ Return all object IDs in a stable (sorted) order
+        The list is built once and kept sorted as objects are added or
+        removed: it must not be modified by the caller, and should be
+        copied before iterating it at length
+        """
+        s_class = cls.__name__
+        ids = ORDERED_IDS.get(s_class)
+        if ids is None:
+            with STORE_LOCK:
+                ids = ORDERED_IDS.get(s_class)
+                if ids is None:
+                    ids = sorted(DATA[s_class].keys())
+                    ORDERED_IDS[s_class] = ids
+        return ids
+
+    @classmethod
+    def _ordered_add(cls, obj_id: str):
+        """ Insert a new ID in the sorted ID list, if built (lock held)
+        """
+        ids = ORDERED_IDS.get(cls.__name__)
+        if ids is not None:
+            insort(ids, obj_id)
+
+    @classmethod
+    def _ordered_discard(cls, obj_id: str):
+        """ Remove an ID from the sorted ID list, if built (lock held)
+        """
+        ids = ORDERED_IDS.get(cls.__name__)
+        if ids is not None:
+            i = bisect_left(ids, obj_id)
+            if i < len(ids) and ids[i] == obj_id:
+                del ids[i]
+
+    @classmethod
+    def page(cls, limit: int,
+             cursor: Optional[str] = None
+             ) -> Tuple[List[TypeVar('Base')], Optional[str]]:
+        """ Return up to `limit` objects following `cursor` (an ID)
+        in ID order, and the cursor of the next page (None at the end)
+        """
+        s_class = cls.__name__
+        ids = cls.ordered_ids()
+        start = 0 if cursor is None else bisect_right(ids, cursor)
+        page_ids = ids[start:start + limit]
+        objs = [DATA[s_class][obj_id] for obj_id in page_ids
+                if obj_id in DATA[s_class]]
+        next_cursor = None
+        if start + limit < len(ids) and len(page_ids) > 0:
+            next_cursor = page_ids[-1]
+        return objs, next_cursor
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
@@ -133,5 +726,37 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+
+        candidates = cls._index_candidates(attributes)
+        if candidates is None:
+            candidates = DATA[s_class].values()
+        return list(filter(_search, candidates))
+
+    @classmethod
+    def _index_candidates(cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Return the objects matching the most selective indexed
+        attribute, or None if no attribute of the search is indexed
+        """
+        s_class = cls.__name__
+        fields = [k for k in attributes if k in cls.indexed_fields]
+        if len(fields) == 0:
+            return None
+        # the index sets are live: hold the lock so a concurrent save or
+        # remove can't resize the one being read
+        with STORE_LOCK:
+            if s_class not in INDEXES:
+                cls.rebuild_indexes()
+            best = None
+            for field in fields:
+                index = INDEXES[s_class][field]
+                ids = index.get(cls._index_key(attributes[field]), set())
+                unhashable = index.get(UNHASHABLE)
+                if unhashable and ids is not unhashable:
+                    ids = ids | unhashable
+                if best is None or len(ids) < len(best):
+                    best = ids
+            objs = DATA[s_class]
+            return [objs[obj_id] for obj_id in best if obj_id in objs]
+
+
+atexit.register(Base.flush)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+""" Password hashers module
+Encoded passwords record the algorithm and cost used:
+    <algorithm>$<iterations>$<salt>$<hash>
+Legacy passwords are a bare, unsalted SHA-256 hexdigest.
+"""
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+from typing import List, Optional
+
+
+DEFAULT_ALGORITHM = getenv('USER_PASSWORD_HASHER', 'pbkdf2_sha256')
+DEFAULT_ITERATIONS = int(getenv('USER_PASSWORD_ITERATIONS', '100000'))
+# threads hashing the passwords of make_passwords(): PBKDF2 runs in
+# OpenSSL without the GIL, so threads use all cores
+HASH_WORKERS = int(getenv('USER_PASSWORD_HASH_WORKERS',
+                          str(os.cpu_count() or 1)))
+HASH_POOL = []
+HASH_POOL_LOCK = threading.Lock()
+
+
+class SHA256Hasher():
+    """ Legacy unsalted SHA-256 hasher
+    """
+    algorithm = 'sha256'
+
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+        return hashlib.sha256(pwd.encode()).hexdigest().lower()
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against an encoded hash
+        """
+        return hmac.compare_digest(self.encode(pwd), encoded)
+
+    def cost(self, encoded: str) -> int:
+        """ Return the cost the hash was computed with
+        """
+        return 1
+
+
+class PBKDF2Hasher():
+    """ Salted PBKDF2-HMAC-SHA256 hasher
+    """
+    algorithm = 'pbkdf2_sha256'
+
+    def __init__(self, iterations: int = DEFAULT_ITERATIONS):
+        """ Initialize the hasher with the cost of new hashes
+        """
+        self.iterations = iterations
+
+    def _derive(self, secret: str, salt: str, iterations: int) -> str:
+        """ Return the hex PBKDF2 derivation of a secret
+        """
+        return hashlib.pbkdf2_hmac('sha256', secret.encode(),
+                                   salt.encode(), iterations).hex()
+
+    def _prepare(self, pwd: str) -> str:
+        """ Return the secret actually fed to PBKDF2
+        """
+        return pwd
+
+    def encode(self, pwd: str, salt: Optional[str] = None) -> str:
+        """ Hash a password
+        """
+        if salt is None:
+            salt = os.urandom(16).hex()
+        return "{}${}${}${}".format(
+            self.algorithm, self.iterations, salt,
+            self._derive(self._prepare(pwd), salt, self.iterations))
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against an encoded hash
+        """
+        try:
+            _, iterations, salt, digest = encoded.split('$')
+            iterations = int(iterations)
+        except ValueError:
+            return False
+        return hmac.compare_digest(
+            self._derive(self._prepare(pwd), salt, iterations), digest)
+
+    def cost(self, encoded: str) -> int:
+        """ Return the number of iterations the hash was computed with
+        """
+        return int(encoded.split('$')[1])
+
+
+class WrappedSHA256Hasher(PBKDF2Hasher):
+    """ PBKDF2 over a legacy SHA-256 hexdigest, so legacy hashes can be
+    strengthened offline without knowing the passwords
+    """
+    algorithm = 'pbkdf2_wrapped_sha256'
+
+    def _prepare(self, pwd: str) -> str:
+        """ Return the legacy SHA-256 hexdigest of the password
+        """
+        return SHA256Hasher().encode(pwd)
+
+    def wrap(self, legacy: str, salt: Optional[str] = None) -> str:
+        """ Strengthen a legacy SHA-256 hexdigest
+        """
+        if salt is None:
+            salt = os.urandom(16).hex()
+        return "{}${}${}${}".format(
+            self.algorithm, self.iterations, salt,
+            self._derive(legacy, salt, self.iterations))
+
+
+HASHERS = {
+    SHA256Hasher.algorithm: SHA256Hasher(),
+    PBKDF2Hasher.algorithm: PBKDF2Hasher(),
+    WrappedSHA256Hasher.algorithm: WrappedSHA256Hasher(),
+}
+
+
+def identify(encoded: str):
+    """ Return the hasher that produced an encoded password
+    """
+    if '$' not in encoded:
+        return HASHERS[SHA256Hasher.algorithm]
+    return HASHERS.get(encoded.split('$', 1)[0])
+
+
+def make_password(pwd: str) -> str:
+    """ Hash a password with the default hasher
+    """
+    return HASHERS[DEFAULT_ALGORITHM].encode(pwd)
+
+
+def make_passwords(pwds: List[str]) -> List[str]:
+    """ Hash several passwords with the default hasher, in parallel on
+    HASH_WORKERS threads (about 40 ms of CPU each at 100k iterations)
+    """
+    if len(pwds) <= 1 or HASH_WORKERS <= 1:
+        return [make_password(pwd) for pwd in pwds]
+    with HASH_POOL_LOCK:
+        if len(HASH_POOL) == 0:
+            HASH_POOL.append(ThreadPoolExecutor(
+                max_workers=HASH_WORKERS, thread_name_prefix="hashers"))
+    return list(HASH_POOL[0].map(make_password, pwds))
+
+
+def check_password(pwd: str, encoded: str) -> bool:
+    """ Check a password against an encoded hash of any known hasher
+    """
+    hasher = identify(encoded)
+    if hasher is None:
+        return False
+    return hasher.verify(pwd, encoded)
+
+
+def needs_rehash(encoded: str) -> bool:
+    """ Tell if an encoded password isn't using the default hasher
+    and its current cost
+    """
+    hasher = identify(encoded)
+    default = HASHERS[DEFAULT_ALGORITHM]
+    if hasher is not default:
+        return True
+    return hasher.cost(encoded) != getattr(default, 'iterations', 1)
@@ -1,14 +1,20 @@
 #!/usr/bin/env python3
 """ User module
 """
-import hashlib
-from models.base import Base
+import sys
+from models.base import Base, COMPACT_MODELS
+from models import hashers
 
 
 class User(Base):
     """ User class
     """
 
+    if COMPACT_MODELS:
+        __slots__ = ('email', '_password', 'first_name', 'last_name')
+
+    indexed_fields = ('email',)
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
@@ -17,6 +23,12 @@ class User(Base):
         self._password = kwargs.get('_password')
         self.first_name = kwargs.get('first_name')
         self.last_name = kwargs.get('last_name')
+        if COMPACT_MODELS:
+            # names repeat a lot across users, share one copy of each
+            if type(self.first_name) is str:
+                self.first_name = sys.intern(self.first_name)
+            if type(self.last_name) is str:
+                self.last_name = sys.intern(self.last_name)
 
     @property
     def password(self) -> str:
@@ -26,12 +38,12 @@ class User(Base):
 
     @password.setter
     def password(self, pwd: str):
-        """ Setter of a new password: encrypt in SHA256
+        """ Setter of a new password: hashed with the default hasher
         """
         if pwd is None or type(pwd) is not str:
             self._password = None
         else:
-            self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
+            self._password = hashers.make_password(pwd)
 
     def is_valid_password(self, pwd: str) -> bool:
         """ Validate a password
@@ -40,8 +52,14 @@ class User(Base):
             return False
         if self.password is None:
             return False
-        pwd_e = pwd.encode()
-        return hashlib.sha256(pwd_e).hexdigest().lower() == self.password
+        return hashers.check_password(pwd, self.password)
+
+    def password_needs_rehash(self) -> bool:
+        """ Tell if the password hash uses a legacy algorithm or cost
+        """
+        if self.password is None:
+            return False
+        return hashers.needs_rehash(self.password)
 
     def display_name(self) -> str:
         """ Display User name based on email/first_name/last_name
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+""" Tests of the persistence of models.base: journal replay and
+compaction, lazy loading and batched durability
+Run from this directory with: python -m pytest -q
+"""
+import json
+import os
+import pytest
+from models import base
+from models.base import Base
+from models.user import User
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    """ Empty store in a temporary directory, journal mode, sync
+    durability
+    """
+    monkeypatch.chdir(tmp_path)
+    for name in ('DATA', 'JOURNAL_SIZES', 'INDEXES', 'ORDERED_IDS',
+                 'PENDING'):
+        monkeypatch.setattr(base, name, {})
+    monkeypatch.setattr(base, 'FLUSHER', [])
+    monkeypatch.setattr(base, 'JOURNAL_MODE', True)
+    monkeypatch.setattr(base, 'JOURNAL_COMPACT_EVERY', 1000)
+    monkeypatch.setattr(base, 'LAZY_LOAD', False)
+    monkeypatch.setattr(base, 'DURABILITY', 'sync')
+    return tmp_path
+
+
+def make_user(email: str) -> User:
+    """ Save a new user without a password (hashing is slow)
+    """
+    user = User(email=email)
+    user.save()
+    return user
+
+
+def journal_lines() -> list:
+    """ Return the lines of the User journal
+    """
+    if not os.path.exists(".db_User.journal"):
+        return []
+    with open(".db_User.journal") as f:
+        return f.read().splitlines()
+
+
+def reload() -> dict:
+    """ Forget the users in memory, load them back and return
+    their emails by id
+    """
+    base.DATA.pop('User', None)
+    User.load_from_file()
+    return {user.id: user.email for user in User.all()}
+
+
+def test_save_then_remove():
+    """ A removed user doesn't come back after a reload
+    """
+    kept = make_user("kept@example.com")
+    removed = make_user("removed@example.com")
+    removed.remove()
+    assert [json.loads(line)['op'] for line in journal_lines()] == \
+        ['save', 'save', 'remove']
+    assert reload() == {kept.id: "kept@example.com"}
+
+
+def test_replay_after_torn_last_line():
+    """ The complete records are replayed, the torn tail is dropped
+    and the journal is compacted away
+    """
+    user = make_user("a@example.com")
+    with open(".db_User.journal", 'a') as f:
+        f.write('{"op": "save", "obj": {"id": "torn", "em')
+    assert reload() == {user.id: "a@example.com"}
+    assert journal_lines() == []
+    assert not os.path.exists(".db_User.journal.old")
+    make_user("b@example.com")
+    assert len(reload()) == 2
+
+
+def test_compaction():
+    """ Every JOURNAL_COMPACT_EVERY records the journal is folded
+    into the snapshot
+    """
+    base.JOURNAL_COMPACT_EVERY = 3
+    users = [make_user("{}@example.com".format(i)) for i in range(4)]
+    with open(".db_User.json") as f:
+        assert len(json.load(f)) == 3
+    assert len(journal_lines()) == 1
+    assert base.JOURNAL_SIZES['User'] == 1
+    assert reload() == {user.id: user.email for user in users}
+
+
+def test_replay_rotated_journal():
+    """ A journal rotated out by an interrupted snapshot is replayed
+    before the current one, then removed
+    """
+    first = make_user("first@example.com")
+    os.replace(".db_User.journal", ".db_User.journal.old")
+    second = make_user("second@example.com")
+    assert reload() == {first.id: "first@example.com",
+                        second.id: "second@example.com"}
+    assert not os.path.exists(".db_User.journal.old")
+
+
+def test_lazy_load():
+    """ With a matching index the snapshot is mapped, not parsed
+    """
+    base.LAZY_LOAD = True
+    user = make_user("lazy@example.com")
+    User.save_to_file()
+    assert reload() == {user.id: "lazy@example.com"}
+    assert isinstance(base.DATA['User'], base.LazyObjects)
+    assert User.search({'email': "lazy@example.com"}) == [user]
+
+
+def test_lazy_load_stale_index():
+    """ An index that doesn't match the snapshot falls back to a full
+    load
+    """
+    base.LAZY_LOAD = True
+    user = make_user("old@example.com")
+    User.save_to_file()
+    with open(".db_User.json") as f:
+        objs = json.load(f)
+    objs[user.id]['email'] = "new@example.com"
+    with open(".db_User.json", 'w') as f:
+        json.dump(objs, f)
+    assert reload() == {user.id: "new@example.com"}
+    assert not isinstance(base.DATA['User'], base.LazyObjects)
+
+
+def test_batched_flush(monkeypatch):
+    """ Batched mutations reach the journal on flush, and a reload
+    flushes them first
+    """
+    monkeypatch.setattr(base, 'DURABILITY', 'batched')
+    monkeypatch.setattr(base, 'FLUSH_INTERVAL_MS', 60000)
+    monkeypatch.setattr(base, 'FLUSH_MAX_MUTATIONS', 1000)
+    first = make_user("first@example.com")
+    assert journal_lines() == []
+    Base.flush()
+    assert len(journal_lines()) == 1
+    assert base.PENDING == {}
+    second = make_user("second@example.com")
+    assert reload() == {first.id: "first@example.com",
+                        second.id: "second@example.com"}
+
+
+def test_save_many_rolls_back(monkeypatch):
+    """ A failed write keeps none of the objects of the batch
+    """
+    kept = make_user("kept@example.com")
+    User.search({'email': "kept@example.com"})
+    User.ordered_ids()
+
+    def fail(records):
+        """ Simulate a full disk
+        """
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(User, '_persist', fail)
+    with pytest.raises(OSError):
+        User.save_many([User(email="a@example.com"),
+                        User(email="b@example.com")])
+    assert [user.id for user in User.all()] == [kept.id]
+    assert User.ordered_ids() == [kept.id]
+    assert User.search({'email': "a@example.com"}) == []
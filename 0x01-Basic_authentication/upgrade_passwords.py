@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+""" Offline upgrade of the legacy SHA-256 password hashes of .db_User.json
+Each legacy hash is wrapped in PBKDF2 (pbkdf2_wrapped_sha256), using a
+process pool; users get the default hasher at their next login.
+Usage: ./upgrade_passwords.py [--workers N] [--iterations N]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+from models import hashers
+from models.user import User
+
+
+def wrap_chunk(chunk: List[Tuple[str, str]],
+               iterations: int) -> List[Tuple[str, str]]:
+    """ Wrap the legacy hashes of a chunk of (user id, hash)
+    """
+    hasher = hashers.WrappedSHA256Hasher(iterations)
+    return [(user_id, hasher.wrap(legacy)) for user_id, legacy in chunk]
+
+
+def upgrade(workers: int, iterations: int, chunk_size: int = 64) -> None:
+    """ Wrap every legacy hash of the store and save it once
+    """
+    User.load_from_file()
+    sha256 = hashers.HASHERS[hashers.SHA256Hasher.algorithm]
+    legacy = [(user.id, user.password) for user in User.all()
+              if user.password is not None
+              and hashers.identify(user.password) is sha256]
+    chunks = [legacy[i:i + chunk_size]
+              for i in range(0, len(legacy), chunk_size)]
+
+    start = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(wrap_chunk, chunks,
+                               [iterations] * len(chunks))
+        for result in results:
+            for user_id, encoded in result:
+                User.get(user_id)._password = encoded
+            done += len(result)
+            print("\r{}/{} hashes".format(done, len(legacy)),
+                  end="", flush=True)
+    elapsed = time.perf_counter() - start
+    User.save_to_file()
+    print("\n{} hashes upgraded in {:.2f}s ({:.1f} hashes/s, "
+          "{} workers, {} iterations)".format(
+              done, elapsed, done / elapsed if elapsed else 0.0,
+              workers, iterations))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--iterations', type=int,
+                        default=hashers.DEFAULT_ITERATIONS)
+    args = parser.parse_args()
+    upgrade(args.workers, args.iterations)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Admission control for expensive endpoints: token buckets per route and
+per client IP plus a concurrency limit, checked before any work starts.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+from flask import jsonify, request
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens per second up to `burst`.
+    Not thread-safe: the AdmissionController lock protects it.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        """
+        Initialize a full bucket.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take one token; return 0 if taken, else the seconds to wait.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Admission control of one route. A rate of 0 disables the matching
+    bucket and a concurrency of 0 disables the concurrency limit.
+    """
+
+    def __init__(self, rate: float = 0, burst: float = 1,
+                 ip_rate: float = 0, ip_burst: float = 1,
+                 concurrency: int = 0, max_clients: int = 10000) -> None:
+        """
+        Initialize the controller.
+
+        Args:
+            rate (float): Requests per second admitted on the route.
+            burst (float): Burst size of the route bucket.
+            ip_rate (float): Requests per second admitted per client IP.
+            ip_burst (float): Burst size of each client bucket.
+            concurrency (int): Requests allowed in progress at once.
+            max_clients (int): Client buckets kept (least recent dropped).
+        """
+        self.route_bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+        self.concurrency = concurrency
+        self.max_clients = max_clients
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {"admitted": 0, "rejected_rate": 0,
+                          "rejected_ip_rate": 0, "rejected_concurrency": 0}
+
+    @classmethod
+    def from_env(cls, name: str) -> "AdmissionController":
+        """
+        Build a controller from ADMISSION_<NAME>_<SETTING> variables,
+        falling back to ADMISSION_<SETTING>. Settings: RATE, BURST,
+        IP_RATE, IP_BURST and CONCURRENCY (default: 5 per core).
+        """
+        def setting(key: str, default: str) -> str:
+            """
+            Return the route setting, or the shared one.
+            """
+            return os.getenv("ADMISSION_{}_{}".format(name.upper(), key),
+                             os.getenv("ADMISSION_{}".format(key), default))
+
+        return cls(rate=float(setting("RATE", "0")),
+                   burst=float(setting("BURST", "10")),
+                   ip_rate=float(setting("IP_RATE", "0")),
+                   ip_burst=float(setting("IP_BURST", "5")),
+                   concurrency=int(setting(
+                       "CONCURRENCY", str(5 * (os.cpu_count() or 1)))))
+
+    def acquire(self, client: str) -> Optional[Tuple[int, int]]:
+        """
+        Admit a request of a client.
+
+        Returns:
+            None if admitted (call release() when done), otherwise the
+            status (429 or 503) and Retry-After seconds to answer with.
+        """
+        with self._lock:
+            if self.concurrency > 0 and self._in_flight >= self.concurrency:
+                self._counters["rejected_concurrency"] += 1
+                return 503, 1
+            if self.ip_rate > 0:
+                bucket = self._clients.get(client)
+                if bucket is None:
+                    bucket = TokenBucket(self.ip_rate, self.ip_burst)
+                    self._clients[client] = bucket
+                    if len(self._clients) > self.max_clients:
+                        self._clients.popitem(last=False)
+                else:
+                    self._clients.move_to_end(client)
+                wait = bucket.take()
+                if wait > 0:
+                    self._counters["rejected_ip_rate"] += 1
+                    return 429, math.ceil(wait)
+            if self.route_bucket is not None:
+                wait = self.route_bucket.take()
+                if wait > 0:
+                    self._counters["rejected_rate"] += 1
+                    return 429, math.ceil(wait)
+            self._in_flight += 1
+            self._counters["admitted"] += 1
+            return None
+
+    def release(self) -> None:
+        """
+        Mark an admitted request as done.
+        """
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters and the number of requests in progress.
+        """
+        with self._lock:
+            return dict(self._counters, in_flight=self._in_flight,
+                        clients=len(self._clients))
+
+
+def admission_controlled(controller: AdmissionController) -> Callable:
+    """
+    Decorate a Flask view so requests over the limits are shed with
+    429/503 and Retry-After before the view runs.
+    """
+    def decorator(view: Callable) -> Callable:
+        """
+        Wrap the view.
+        """
+        @wraps(view)
+        def admitted_view(*args, **kwargs):
+            """
+            Run the view if the request is admitted.
+            """
+            rejection = controller.acquire(request.remote_addr)
+            if rejection is not None:
+                status, retry_after = rejection
+                message = "too many requests" if status == 429 \
+                    else "server busy, retry later"
+                return jsonify({"message": message}), status, \
+                    {"Retry-After": str(retry_after)}
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release()
+        return admitted_view
+    return decorator
@@ -3,15 +3,48 @@
 Flask application for user registration.
 """
 
-from flask import Flask, request, jsonify
-from auth import Auth
+from os import getenv
+from flask import Flask, abort, jsonify, redirect, request
+from admission import AdmissionController, admission_controlled
+from auth import Auth, PoolOverloaded
 
 # Initialize Flask app and Auth instance
 app = Flask(__name__)
 AUTH = Auth()
+ADMISSION = {
+    "register": AdmissionController.from_env("register"),
+    "login": AdmissionController.from_env("login"),
+}
+
+if getenv("METRICS_ENABLED", "0") == "1":
+    from instrumentation import Metrics
+    metrics = Metrics()
+    metrics.init_flask(app)
+    AUTH.enable_metrics(metrics)
+    for route, controller in ADMISSION.items():
+        for key in controller.stats():
+            metrics.gauge("admission_{}_{}".format(route, key),
+                          lambda c=controller, k=key: c.stats()[k])
+
+
+@app.teardown_appcontext
+def close_db_session(exception: BaseException = None) -> None:
+    """
+    Returns the database session of the request to the pool.
+    """
+    AUTH.close_session()
+
+
+@app.route('/', methods=['GET'])
+def index():
+    """
+    Returns a welcome message.
+    """
+    return jsonify({"message": "Bienvenue"})
 
 
 @app.route('/users', methods=['POST'])
+@admission_controlled(ADMISSION["register"])
 def register_user():
     """
     Handles user registration via POST request to /users.
@@ -20,6 +53,8 @@ def register_user():
     Returns:
         JSON: A response with the email and a message if the user is created.
         JSON: A response with a message and status 400 if email isregistered.
+        JSON: A response with status 503 if the server is too busy.
+        JSON: A response with status 429 if the client is rate limited.
         """
     email = request.form.get('email')
     password = request.form.get('password')
@@ -32,6 +67,64 @@ def register_user():
         return jsonify({"email": user.email, "message": "user created"})
     except ValueError as err:
         return jsonify({"message": str(err)}), 400
+    except PoolOverloaded:
+        return jsonify({"message": "server busy, retry later"}), 503, \
+            {"Retry-After": "1"}
+
+
+@app.route('/sessions', methods=['POST'])
+@admission_controlled(ADMISSION["login"])
+def login():
+    """
+    Logs a user in with the 'email' and 'password' form fields.
+
+    Returns:
+        JSON: The email and a message, with a session_id cookie.
+        401 if the credentials are wrong, 503 if the server is too busy,
+        429 if the client is rate limited.
+    """
+    email = request.form.get('email')
+    password = request.form.get('password')
+    try:
+        if not email or not password or \
+                not AUTH.valid_login(email, password):
+            abort(401)
+    except PoolOverloaded:
+        return jsonify({"message": "server busy, retry later"}), 503, \
+            {"Retry-After": "1"}
+    session_id = AUTH.create_session(email)
+    response = jsonify({"email": email, "message": "logged in"})
+    response.set_cookie("session_id", session_id)
+    return response
+
+
+@app.route('/sessions', methods=['DELETE'])
+def logout():
+    """
+    Logs out the user of the session_id cookie.
+
+    Returns:
+        A redirection to GET /, or 403 if the session doesn't exist.
+    """
+    user = AUTH.get_user_from_session_id(request.cookies.get("session_id"))
+    if user is None:
+        abort(403)
+    AUTH.destroy_session(user.id)
+    return redirect('/')
+
+
+@app.route('/profile', methods=['GET'])
+def profile():
+    """
+    Returns the email of the user of the session_id cookie.
+
+    Returns:
+        JSON: The email, or 403 if the session doesn't exist.
+    """
+    user = AUTH.get_user_from_session_id(request.cookies.get("session_id"))
+    if user is None:
+        abort(403)
+    return jsonify({"email": user.email})
 
 
 if __name__ == '__main__':
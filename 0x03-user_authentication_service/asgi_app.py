@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+ASGI application serving the routes of app.py asynchronously.
+Run with: uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+import json
+from http.cookies import SimpleCookie
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import parse_qs
+from admission import AdmissionController
+from async_auth import AsyncAuth
+from hashing_pool import PoolOverloaded
+
+AUTH = AsyncAuth()
+ADMISSION = {
+    "register": AdmissionController.from_env("register"),
+    "login": AdmissionController.from_env("login"),
+}
+
+
+class Request:
+    """
+    Minimal view of an ASGI HTTP request.
+    """
+
+    def __init__(self, scope: Dict[str, Any], body: bytes) -> None:
+        """
+        Initialize the request from its scope and full body.
+        """
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.client = (scope.get("client") or ("", 0))[0]
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1")
+                        for k, v in scope.get("headers", [])}
+        self.form = {k: v[0] for k, v in
+                     parse_qs(body.decode("utf-8", "replace")).items()}
+        cookies = SimpleCookie(self.headers.get("cookie", ""))
+        self.cookies = {k: morsel.value for k, morsel in cookies.items()}
+
+
+Response = Tuple[int, Dict[str, Any], List[Tuple[str, str]]]
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+def json_response(payload: Dict[str, Any], status: int = 200,
+                  headers: List[Tuple[str, str]] = None) -> Response:
+    """
+    Build a JSON response.
+    """
+    return status, payload, headers or []
+
+
+def admission_controlled(controller: AdmissionController) -> Callable:
+    """
+    Decorate a handler so requests over the limits are shed with
+    429/503 and Retry-After before the handler runs.
+    """
+    def decorator(handler: Handler) -> Handler:
+        """
+        Wrap the handler.
+        """
+        async def admitted_handler(request: Request) -> Response:
+            """
+            Run the handler if the request is admitted.
+            """
+            rejection = controller.acquire(request.client)
+            if rejection is not None:
+                status, retry_after = rejection
+                message = "too many requests" if status == 429 \
+                    else "server busy, retry later"
+                return json_response({"message": message}, status,
+                                     [("retry-after", str(retry_after))])
+            try:
+                return await handler(request)
+            finally:
+                controller.release()
+        return admitted_handler
+    return decorator
+
+
+async def index(request: Request) -> Response:
+    """
+    GET /: returns a welcome message.
+    """
+    return json_response({"message": "Bienvenue"})
+
+
+@admission_controlled(ADMISSION["register"])
+async def register_user(request: Request) -> Response:
+    """
+    POST /users: registers a user from the email and password fields.
+    Shed with 503/429 over the ADMISSION_REGISTER_* limits.
+    """
+    email = request.form.get("email")
+    password = request.form.get("password")
+    if not email or not password:
+        return json_response(
+            {"message": "email and password are required"}, 400)
+    try:
+        user = await AUTH.register_user(email, password)
+        return json_response({"email": user.email, "message": "user created"})
+    except ValueError as err:
+        return json_response({"message": str(err)}, 400)
+
+
+@admission_controlled(ADMISSION["login"])
+async def login(request: Request) -> Response:
+    """
+    POST /sessions: logs a user in and sets the session_id cookie.
+    Shed with 503/429 over the ADMISSION_LOGIN_* limits.
+    """
+    email = request.form.get("email")
+    password = request.form.get("password")
+    if not email or not password or \
+            not await AUTH.valid_login(email, password):
+        return json_response({"error": "Unauthorized"}, 401)
+    session_id = await AUTH.create_session(email)
+    return json_response({"email": email, "message": "logged in"}, 200,
+                         [("set-cookie", "session_id={}; Path=/".format(
+                             session_id))])
+
+
+async def logout(request: Request) -> Response:
+    """
+    DELETE /sessions: logs out the user of the session_id cookie.
+    """
+    user = await AUTH.get_user_from_session_id(
+        request.cookies.get("session_id"))
+    if user is None:
+        return json_response({"error": "Forbidden"}, 403)
+    await AUTH.destroy_session(user.id)
+    return 302, None, [("location", "/")]
+
+
+async def profile(request: Request) -> Response:
+    """
+    GET /profile: returns the email of the user of the session.
+    """
+    user = await AUTH.get_user_from_session_id(
+        request.cookies.get("session_id"))
+    if user is None:
+        return json_response({"error": "Forbidden"}, 403)
+    return json_response({"email": user.email})
+
+
+ROUTES: Dict[Tuple[str, str], Handler] = {
+    ("GET", "/"): index,
+    ("POST", "/users"): register_user,
+    ("POST", "/sessions"): login,
+    ("DELETE", "/sessions"): logout,
+    ("GET", "/profile"): profile,
+}
+
+
+async def app(scope: Dict[str, Any], receive: Callable,
+              send: Callable) -> None:
+    """
+    ASGI entry point.
+    """
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    request = Request(scope, body)
+
+    handler = ROUTES.get((request.method, request.path.rstrip("/") or "/"))
+    if handler is None:
+        status, payload, headers = 404, {"error": "Not found"}, []
+    else:
+        try:
+            status, payload, headers = await handler(request)
+        except PoolOverloaded:
+            status, payload, headers = 503, {
+                "message": "server busy, retry later"}, [("retry-after", "1")]
+
+    content = b"" if payload is None else json.dumps(payload).encode()
+    raw_headers = [(b"content-type", b"application/json"),
+                   (b"content-length", str(len(content)).encode())]
+    raw_headers += [(k.encode("latin-1"), v.encode("latin-1"))
+                    for k, v in headers]
+    await send({"type": "http.response.start", "status": status,
+                "headers": raw_headers})
+    await send({"type": "http.response.body", "body": content})
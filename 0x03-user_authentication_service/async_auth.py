@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Async Auth module: Auth counterpart for the ASGI app.
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import NoResultFound
+from async_db import AsyncDB
+from auth import (_check_password, _generate_uuid, _hash_password,
+                  SESSION_LIFETIME)
+from hashing_pool import HashingPool
+from user import User
+
+
+class AsyncAuth:
+    """
+    AsyncAuth class to interact with the authentication database
+    from coroutines; bcrypt runs on the hashing pool.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the instance
+        """
+        self._db = AsyncDB()
+        self._hashing = HashingPool()
+
+    async def register_user(self, email: str, password: str) -> User:
+        """
+        Registers a new user and returns a User object.
+
+        email: User's email.
+        password: User's password.
+        return: User object.
+        raises ValueError: If the user with the given email already exists.
+        raises PoolOverloaded: If the hashing queue is full.
+        """
+        # an existing email is rejected before paying for a bcrypt hash
+        try:
+            await self._db.find_user_by(email=email)
+            raise ValueError(f"User {email} already exists")
+        except NoResultFound:
+            pass
+        hashed_pwd = await self._hashing.run_async(_hash_password, password)
+        try:
+            # the unique constraint still catches concurrent duplicates
+            return await self._db.add_user(
+                    email=email, hashed_password=hashed_pwd.decode("utf-8"))
+        except IntegrityError:
+            raise ValueError(f"User {email} already exists")
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """
+        Checks the credentials of a user on the hashing pool.
+
+        email: User's email.
+        password: User's password.
+        return: True if the user exists and the password matches.
+        raises PoolOverloaded: If the hashing queue is full.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return False
+        return await self._hashing.run_async(_check_password, password,
+                                             user.hashed_password)
+
+    async def create_session(self, email: str) -> Optional[str]:
+        """
+        Creates a new session for a user.
+
+        email: User's email.
+        return: The session ID, or None if the user doesn't exist.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return None
+        session_id = _generate_uuid()
+        await self._db.update_user(user.id, session_id=session_id,
+                                   session_created_at=datetime.utcnow())
+        return session_id
+
+    async def get_user_from_session_id(self,
+                                       session_id: str) -> Optional[User]:
+        """
+        Finds the user of a live session.
+
+        session_id: The session ID.
+        return: The User, or None if the session doesn't exist.
+        """
+        if session_id is None:
+            return None
+        try:
+            user = await self._db.find_user_by(session_id=session_id)
+        except NoResultFound:
+            return None
+        if SESSION_LIFETIME > 0 and user.session_created_at is not None:
+            age = datetime.utcnow() - user.session_created_at
+            if age.total_seconds() >= SESSION_LIFETIME:
+                return None
+        return user
+
+    async def destroy_session(self, user_id: int) -> None:
+        """
+        Ends the session of a user.
+
+        user_id: The user's ID.
+        """
+        await self._db.update_user(user_id, session_id=None,
+                                   session_created_at=None)
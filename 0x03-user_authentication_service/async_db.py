@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Async DB module: DB counterpart on async SQLAlchemy (aiosqlite).
+"""
+import asyncio
+from os import getenv
+from sqlalchemy import select, update
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import NoResultFound
+from db import check_columns
+from user import Base, User
+
+
+def async_database_url(database_url: str) -> str:
+    """
+    Turn a sqlite:// URL into its aiosqlite equivalent.
+
+    Args:
+        database_url (str): The SQLAlchemy database URL.
+
+    Returns:
+        str: The URL with an async driver.
+    """
+    if database_url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + database_url[len("sqlite://"):]
+    return database_url
+
+
+class AsyncDB:
+    """
+    AsyncDB class
+    """
+
+    def __init__(self, database_url: str = None,
+                 drop_existing: bool = None) -> None:
+        """
+        Initialize a new AsyncDB instance; tables are created on first use.
+
+        Args:
+            database_url (str): The database URL, AUTH_DB_URL or
+                sqlite:///a.db by default.
+            drop_existing (bool): Whether to drop existing tables first,
+                unless AUTH_DB_DROP=0 by default.
+        """
+        if database_url is None:
+            database_url = getenv("AUTH_DB_URL", "sqlite:///a.db")
+        if drop_existing is None:
+            drop_existing = getenv("AUTH_DB_DROP", "1") == "1"
+        self._engine = create_async_engine(async_database_url(database_url))
+        self._drop_existing = drop_existing
+        self._ready = False
+        # created in the running loop: on Python < 3.10 a lock binds to
+        # the loop current at creation, and this runs at import time
+        self._ready_lock = None
+        self._session = sessionmaker(self._engine, class_=AsyncSession,
+                                     expire_on_commit=False)
+
+    async def _ensure_ready(self) -> None:
+        """
+        Create the tables once.
+        """
+        if self._ready:
+            return
+        if self._ready_lock is None:
+            self._ready_lock = asyncio.Lock()
+        async with self._ready_lock:
+            if self._ready:
+                return
+            async with self._engine.begin() as connection:
+                if self._drop_existing:
+                    await connection.run_sync(Base.metadata.drop_all)
+                await connection.run_sync(Base.metadata.create_all)
+            self._ready = True
+
+    async def add_user(self, email: str, hashed_password: str) -> User:
+        """
+        Add a new user to the database.
+
+        Args:
+            email (str): The user's email address.
+            hashed_password (str): The user's hashed password.
+
+        Returns:
+            User: The User object that was created.
+
+        Raises:
+            IntegrityError: If the email is already registered.
+        """
+        await self._ensure_ready()
+        new_user = User(email=email, hashed_password=hashed_password)
+        async with self._session() as session:
+            session.add(new_user)
+            await session.commit()
+        return new_user
+
+    async def find_user_by(self, **kwargs) -> User:
+        """
+        Find a user by an arbitrary attribute.
+
+        Args:
+            kwargs (dict): A dictionary of the attribute to filter by.
+
+        Returns:
+            User: The User object that matches the criteria.
+
+        Raises:
+            NoResultFound: If no user is found with the given criteria.
+            InvalidRequestError: If the query is invalid.
+        """
+        await self._ensure_ready()
+        async with self._session() as session:
+            try:
+                result = await session.execute(
+                    select(User).filter_by(**kwargs))
+                return result.scalar_one()
+            except NoResultFound:
+                raise NoResultFound(
+                    f"No user found with the criteria: {kwargs}")
+            except InvalidRequestError:
+                raise InvalidRequestError(
+                    f"Invalid query with the criteria: {kwargs}")
+
+    async def update_user(self, user_id: int, **kwargs) -> None:
+        """
+        Update a user's attributes with a single UPDATE statement.
+
+        Args:
+            user_id (int): The ID of the user to update.
+            kwargs (dict): A dictionary of the attributes to update.
+
+        Raises:
+            ValueError: If an attribute is not a column of the User model.
+        """
+        check_columns(User, kwargs)
+        if not kwargs:
+            return
+        await self._ensure_ready()
+        async with self._session() as session:
+            await session.execute(
+                update(User).where(User.id == user_id).values(**kwargs))
+            await session.commit()
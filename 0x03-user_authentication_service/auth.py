@@ -4,9 +4,28 @@ Module to hash password and interact with auth DB
 """
 # import bcrypt
 import bcrypt
+import sys
+import uuid
+from os import getenv
+from typing import Any, Dict, Optional
+from bloom_filter import BloomFilter
 from db import DB
+from hashing_pool import HashingPool, PoolOverloaded
+from session_store import (CachedSessionStore, SessionSweeper,
+                           SQLAlchemySessionStore)
 from user import User
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import NoResultFound
+
+BCRYPT_ROUNDS = int(getenv("AUTH_BCRYPT_ROUNDS", "12"))
+SESSION_LIFETIME = float(getenv("AUTH_SESSION_LIFETIME", "86400"))
+SESSION_CACHE_SIZE = int(getenv("AUTH_SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(getenv("AUTH_SESSION_CACHE_TTL", "60"))
+SESSION_SWEEP_INTERVAL = float(getenv("AUTH_SESSION_SWEEP_INTERVAL", "300"))
+EMAIL_FILTER = getenv("AUTH_EMAIL_FILTER", "1") == "1"
+EMAIL_FILTER_CAPACITY = int(getenv("AUTH_EMAIL_FILTER_CAPACITY", "1000000"))
+EMAIL_FILTER_ERROR_RATE = float(getenv("AUTH_EMAIL_FILTER_ERROR_RATE",
+                                       "0.01"))
 
 
 def _hash_password(password: str) -> bytes:
@@ -18,13 +37,34 @@ def _hash_password(password: str) -> bytes:
     """
     encoded_pwd = password.encode("utf-8")
 
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
 
     hashed_pwd = bcrypt.hashpw(encoded_pwd, salt)
 
     return hashed_pwd
 
 
+def _check_password(password: str, hashed_password: str) -> bool:
+    """
+    Checks a password against a bcrypt hash.
+
+    password: Raw unhashed password.
+    hashed_password: Hash stored for the user.
+    return: True if the password matches.
+    """
+    return bcrypt.checkpw(password.encode("utf-8"),
+                          hashed_password.encode("utf-8"))
+
+
+def _generate_uuid() -> str:
+    """
+    Generates a new UUID.
+
+    return: String representation of the UUID.
+    """
+    return str(uuid.uuid4())
+
+
 class Auth:
     """
     Auth class to interact with the authentication database.
@@ -35,6 +75,71 @@ class Auth:
         Initialize the instance
         """
         self._db = DB()
+        self._hashing = HashingPool()
+        self._sessions = CachedSessionStore(
+            SQLAlchemySessionStore(self._db, SESSION_LIFETIME),
+            SESSION_CACHE_SIZE, SESSION_CACHE_TTL)
+        self._sweeper = SessionSweeper(self._sessions,
+                                       SESSION_SWEEP_INTERVAL,
+                                       self._db.remove_session)
+        self._sweeper.start()
+        self._emails = None
+        if EMAIL_FILTER:
+            self._emails = BloomFilter(EMAIL_FILTER_CAPACITY,
+                                       EMAIL_FILTER_ERROR_RATE)
+            self._emails.update(self._db.iter_emails())
+            self._db.remove_session()
+
+    def close_session(self) -> None:
+        """
+        Release the database session of the current thread.
+        """
+        self._db.remove_session()
+
+    def hashing_stats(self) -> Dict[str, Any]:
+        """
+        Return the queue depth and latency of the hashing pool.
+        """
+        return self._hashing.stats()
+
+    def email_filter_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the memory and false positive rate of the email filter.
+        """
+        if self._emails is None:
+            return None
+        return self._emails.stats()
+
+    def enable_metrics(self, metrics: Any) -> None:
+        """
+        Time SQL queries and password hashing into an
+        instrumentation.Metrics registry and export pool and cache
+        gauges.
+        """
+        module = sys.modules[__name__]
+        metrics.init_sqlalchemy(self._db.engine)
+        metrics.instrument_function(module, "_hash_password",
+                                    "hash_password_duration_seconds")
+        metrics.instrument_function(module, "_check_password",
+                                    "check_password_duration_seconds")
+        stats = self._hashing.stats
+        metrics.gauge("hashing_queue_depth",
+                      lambda: stats()["queue_depth"],
+                      "Hashing jobs waiting for a worker")
+        metrics.gauge("hashing_in_flight", lambda: stats()["in_flight"],
+                      "Hashing jobs queued or running")
+        metrics.gauge("hashing_rejected_total", lambda: stats()["rejected"],
+                      "Hashing jobs refused because the queue was full")
+        metrics.gauge("session_cache_hits_total",
+                      lambda: self._sessions.stats()[1],
+                      "Session lookups served from the cache")
+        metrics.gauge("session_cache_misses_total",
+                      lambda: self._sessions.stats()[2],
+                      "Session lookups that went to the store")
+        if self._emails is not None:
+            metrics.gauge("email_filter_false_positive_rate",
+                          self._emails.false_positive_rate,
+                          "Expected false positive rate of the email filter")
 
     def register_user(self, email: str, password: str) -> User:
         """
@@ -44,20 +149,77 @@ class Auth:
         password: User's password.
         return: User object.
         raises ValueError: If the user with the given email already exists.
+        raises PoolOverloaded: If the hashing queue is full.
         """
-        try:
-            existing_user = self._db.find_user_by(email=email)
-            if existing_user:
+        # new emails are definite misses of the filter and skip the
+        # lookup; possible hits are confirmed to avoid hashing for nothing
+        if self._emails is None or email in self._emails:
+            try:
+                self._db.find_user_by(email=email)
                 raise ValueError(f"User {email} already exists")
+            except NoResultFound:
+                pass
+        hashed_pwd = self._hashing.run(_hash_password, password)
+        try:
+            # the unique constraint on email rejects duplicates atomically,
+            # including ones the filter missed (added by other processes)
+            user = self._db.add_user(
+                    email=email, hashed_password=hashed_pwd.decode("utf-8"))
+        except IntegrityError:
+            raise ValueError(f"User {email} already exists")
+        if self._emails is not None:
+            self._emails.add(email)
+        return user
+
+    def valid_login(self, email: str, password: str) -> bool:
+        """
+        Checks the credentials of a user on the hashing pool.
+
+        email: User's email.
+        password: User's password.
+        return: True if the user exists and the password matches.
+        raises PoolOverloaded: If the hashing queue is full.
+        """
+        try:
+            user = self._db.find_user_by(email=email)
         except NoResultFound:
-            pass
+            return False
+        return self._hashing.run(_check_password, password,
+                                 user.hashed_password)
 
-            hashed_pwd = _hash_password(password)
+    def create_session(self, email: str) -> Optional[str]:
+        """
+        Creates a new session for a user.
 
-            new_usr = self._db.add_user(
-                    email=email, hashed_password=hashed_pwd.decode("utf-8"))
-            self._db
-            return new_usr
+        email: User's email.
+        return: The session ID, or None if the user doesn't exist.
+        """
+        try:
+            user = self._db.find_user_by(email=email)
+        except NoResultFound:
+            return None
+        session_id = _generate_uuid()
+        self._sessions.create(user.id, session_id)
+        return session_id
+
+    def get_user_from_session_id(self, session_id: str) -> Optional[User]:
+        """
+        Finds the user of a session, usually without a database query.
+
+        session_id: The session ID.
+        return: The User, or None if the session doesn't exist.
+        """
+        if session_id is None:
+            return None
+        return self._sessions.find_user(session_id)
+
+    def destroy_session(self, user_id: int) -> None:
+        """
+        Ends the session of a user.
+
+        user_id: The user's ID.
+        """
+        self._sessions.destroy(user_id)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Compare POST /users throughput of the Flask app (client threads) and
+the ASGI app (concurrent tasks on one event loop), in process, with the
+same hashing pool size and a temporary SQLite database for each.
+Only 2xx responses count as throughput; the others are reported by
+status, so shed (503/429) or failed requests don't inflate the rate.
+Usage: ./bench_asgi.py [requests] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Tuple
+
+Result = Tuple[float, Counter]
+
+
+def ok_rate(statuses: Counter, seconds: float) -> float:
+    """
+    Return the number of 2xx responses per second.
+    """
+    return sum(count for status, count in statuses.items()
+               if 200 <= status < 300) / seconds
+
+
+def bench_flask(requests: int, concurrency: int) -> Result:
+    """
+    Return the Flask app throughput in successful requests per second
+    and the count of each response status.
+    """
+    from app import app
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def worker(index: int) -> None:
+        """
+        Register the users of one client thread.
+        """
+        client = app.test_client()
+        local = Counter()
+        for i in range(index, requests, concurrency):
+            response = client.post('/users', data={
+                'email': "flask{}@example.com".format(i),
+                'password': "secret"})
+            local[response.status_code] += 1
+        with lock:
+            statuses.update(local)
+
+    threads = [threading.Thread(target=worker, args=(i,))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return ok_rate(statuses, time.perf_counter() - start), statuses
+
+
+def bench_asgi(requests: int, concurrency: int) -> Result:
+    """
+    Return the ASGI app throughput in successful requests per second
+    and the count of each response status.
+    """
+    from asgi_app import app
+    statuses = Counter()
+
+    async def call(i: int) -> None:
+        """
+        Send one registration through the ASGI interface.
+        """
+        body = "email=asgi{}%40example.com&password=secret".format(i)
+        scope = {"type": "http", "method": "POST", "path": "/users",
+                 "headers": [(b"content-type",
+                              b"application/x-www-form-urlencoded")]}
+
+        async def receive() -> dict:
+            """
+            Return the whole request body at once.
+            """
+            return {"type": "http.request", "body": body.encode()}
+
+        async def send(message: dict) -> None:
+            """
+            Count the response status, discard the body.
+            """
+            if message["type"] == "http.response.start":
+                statuses[message["status"]] += 1
+
+        await app(scope, receive, send)
+
+    async def worker(index: int) -> None:
+        """
+        Register the users of one task.
+        """
+        for i in range(index, requests, concurrency):
+            await call(i)
+
+    async def main() -> Result:
+        """
+        Run all tasks and time them.
+        """
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return ok_rate(statuses, time.perf_counter() - start), statuses
+
+    return asyncio.run(main())
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    tmp_dir = tempfile.mkdtemp()
+    print("{} cores, {} requests, concurrency {}".format(
+        os.cpu_count(), requests, concurrency))
+    for name, bench in (("flask", bench_flask), ("asgi", bench_asgi)):
+        os.environ["AUTH_DB_URL"] = "sqlite:///{}".format(
+            os.path.join(tmp_dir, "{}.db".format(name)))
+        os.environ.setdefault("AUTH_HASH_QUEUE", str(concurrency))
+        os.environ.setdefault("ADMISSION_CONCURRENCY", str(concurrency))
+        rate, statuses = bench(requests, concurrency)
+        print("{:>6}: {:>8.1f} req/s  statuses {}".format(
+            name, rate, dict(sorted(statuses.items()))))
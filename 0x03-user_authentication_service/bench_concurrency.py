@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark of POST /users: requests per second for a
+growing number of client threads, against a temporary SQLite database.
+Usage: ./bench_concurrency.py [requests] [threads ...]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+
+def run(app, requests: int, threads: int, prefix: str) -> float:
+    """
+    Send `requests` registrations split over `threads` threads.
+
+    Returns:
+        float: The throughput in requests per second.
+    """
+    def worker(index: int, results: List[int]) -> None:
+        """
+        Register the users of one thread through its own client.
+        """
+        client = app.test_client()
+        for i in range(index, requests, threads):
+            response = client.post('/users', data={
+                'email': "{}-{}@example.com".format(prefix, i),
+                'password': "secret"})
+            results.append(response.status_code)
+
+    results = []
+    workers = [threading.Thread(target=worker, args=(i, results))
+               for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if results.count(200) != requests:
+        raise RuntimeError("some registrations failed")
+    return requests / elapsed
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    counts = [int(a) for a in sys.argv[2:]] or [1, 2, 4, 8]
+    tmp_dir = tempfile.mkdtemp()
+    os.environ['AUTH_DB_URL'] = "sqlite:///{}".format(
+        os.path.join(tmp_dir, "bench.db"))
+    from app import app
+
+    for threads in counts:
+        rate = run(app, requests, threads, "t{}".format(threads))
+        print("{:>3} threads: {:>8.1f} req/s".format(threads, rate))
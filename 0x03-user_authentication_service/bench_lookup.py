@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Lookup latency benchmark of DB.find_user_by on indexed columns (email,
+session_id) and, as a full-scan baseline, on hashed_password.
+Usage: ./bench_lookup.py [rows ...]   (default: 10000 100000 1000000)
+"""
+import os
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from db import DB
+from user import Base, User
+
+
+def populate(database_url: str, rows: int) -> None:
+    """
+    Create the schema and insert `rows` users with executemany.
+    """
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for start in range(0, rows, 10000):
+            connection.execute(User.__table__.insert(), [
+                {'email': "user{}@example.com".format(i),
+                 'hashed_password': "hash{}".format(i),
+                 'session_id': "session{}".format(i)}
+                for i in range(start, min(start + 10000, rows))])
+    engine.dispose()
+
+
+def latency(db: DB, column: str, rows: int, rounds: int) -> float:
+    """
+    Return the mean latency in microseconds of a lookup by `column`.
+    """
+    formats = {'email': "user{}@example.com",
+               'session_id': "session{}",
+               'hashed_password': "hash{}"}
+    start = time.perf_counter()
+    for i in range(rounds):
+        value = formats[column].format((i * 7919) % rows)
+        db.find_user_by(**{column: value})
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10000, 100000, 1000000]
+    tmp_dir = tempfile.mkdtemp()
+    for rows in sizes:
+        url = "sqlite:///{}".format(
+            os.path.join(tmp_dir, "lookup{}.db".format(rows)))
+        populate(url, rows)
+        db = DB(url, drop_existing=False)
+        email = latency(db, 'email', rows, 1000)
+        session = latency(db, 'session_id', rows, 1000)
+        scan = latency(db, 'hashed_password', rows, 20)
+        print("{:>8} rows: email {:>7.1f} us  session_id {:>7.1f} us  "
+              "unindexed {:>10.1f} us".format(rows, email, session, scan))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Registration latency benchmark of Auth.register_user with and without
+the email Bloom filter, for new and already registered emails.
+Usage: ./bench_register.py [existing users] [registrations]
+"""
+import os
+import sys
+import tempfile
+import time
+
+
+def measure(existing: int, registrations: int, use_filter: bool) -> None:
+    """
+    Seed a fresh database and print the mean registration latencies.
+    """
+    import auth
+    from db import DB
+
+    url = "sqlite:///{}".format(os.path.join(
+        tempfile.mkdtemp(), "register.db"))
+    DB(url, drop_existing=True).add_users([
+        {"email": "seed{}@example.com".format(i), "hashed_password": "x"}
+        for i in range(existing)])
+    os.environ["AUTH_DB_URL"] = url
+    os.environ["AUTH_DB_DROP"] = "0"
+    auth.EMAIL_FILTER = use_filter
+    instance = auth.Auth()
+
+    start = time.perf_counter()
+    for i in range(registrations):
+        instance.register_user("new{}@example.com".format(i), "secret")
+    new = (time.perf_counter() - start) / registrations * 1e3
+
+    start = time.perf_counter()
+    for i in range(registrations):
+        try:
+            instance.register_user("seed{}@example.com".format(i), "secret")
+        except ValueError:
+            pass
+    duplicate = (time.perf_counter() - start) / registrations * 1e3
+
+    print("filter={:<5} new {:>7.2f} ms  duplicate {:>7.2f} ms".format(
+        str(use_filter), new, duplicate))
+    if use_filter:
+        print("  {}".format(instance.email_filter_stats()))
+
+
+if __name__ == "__main__":
+    existing = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    registrations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    for use_filter in (False, True):
+        measure(existing, registrations, use_filter)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Bloom filter: a compact set answering "definitely not" or "maybe".
+"""
+import hashlib
+import math
+import threading
+from typing import Any, Dict, Iterable
+
+
+class BloomFilter:
+    """
+    Bloom filter of strings sized for a capacity and false positive rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        """
+        Initialize an empty filter.
+
+        Args:
+            capacity (int): The expected number of items.
+            error_rate (float): The false positive rate at capacity.
+        """
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate)
+                               / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str) -> Iterable[int]:
+        """
+        Return the bit positions of an item (double hashing).
+        """
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        """
+        Add an item.
+        """
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def update(self, items: Iterable[str]) -> None:
+        """
+        Add many items.
+        """
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        """
+        Return False if the item was never added, True if it may have been.
+        """
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+    def false_positive_rate(self) -> float:
+        """
+        Return the expected false positive rate at the current count.
+        """
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) \
+            ** self.hash_count
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the size, fill and expected false positive rate.
+        """
+        return {"items": self.count,
+                "capacity": self.capacity,
+                "bits": self.size,
+                "bytes": len(self._bits),
+                "hash_count": self.hash_count,
+                "false_positive_rate": self.false_positive_rate()}
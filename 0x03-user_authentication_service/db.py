@@ -2,36 +2,146 @@
 """
 DB module
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import InvalidRequestError
+from datetime import datetime
+from functools import lru_cache
+from os import getenv
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Set
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
 from sqlalchemy.orm.session import Session
-from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.orm.exc import NoResultFound, StaleDataError
+from sqlalchemy.pool import QueuePool, StaticPool
 from user import Base, User
 
 
+def _create_engine(database_url: str) -> Engine:
+    """
+    Create an engine with a connection pool tuned from the environment:
+    AUTH_DB_POOL_SIZE, AUTH_DB_MAX_OVERFLOW, AUTH_DB_POOL_TIMEOUT and
+    AUTH_DB_POOL_RECYCLE (seconds).
+
+    Args:
+        database_url (str): The SQLAlchemy database URL.
+
+    Returns:
+        Engine: The engine.
+    """
+    options = {}
+    is_sqlite = database_url.startswith("sqlite")
+    if is_sqlite:
+        # connections are handed between request threads by the pool
+        options["connect_args"] = {"check_same_thread": False}
+    if database_url == "sqlite://" or ":memory:" in database_url:
+        # one shared connection, or every thread gets its own empty DB
+        options["poolclass"] = StaticPool
+    else:
+        options.update(
+            poolclass=QueuePool,
+            pool_size=int(getenv("AUTH_DB_POOL_SIZE", "5")),
+            max_overflow=int(getenv("AUTH_DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(getenv("AUTH_DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(getenv("AUTH_DB_POOL_RECYCLE", "3600")),
+            pool_pre_ping=not is_sqlite)
+    engine = create_engine(database_url, **options)
+
+    if is_sqlite:
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            """
+            Let readers run alongside a writer and wait on locks.
+            """
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+    return engine
+
+
+@lru_cache(maxsize=None)
+def mapped_columns(model: type) -> FrozenSet[str]:
+    """
+    Return the attribute names of the columns mapped on a model,
+    computed once per model.
+
+    Args:
+        model (type): The mapped class.
+
+    Returns:
+        FrozenSet[str]: The column attribute names.
+    """
+    return frozenset(attr.key for attr in inspect(model).column_attrs)
+
+
+def check_columns(model: type, keys: Iterable[str]) -> None:
+    """
+    Check that every key is a column of a model.
+
+    Args:
+        model (type): The mapped class.
+        keys (Iterable[str]): The attribute names to check.
+
+    Raises:
+        ValueError: If a key is not a column of the model.
+    """
+    columns = mapped_columns(model)
+    for key in keys:
+        if key not in columns:
+            raise ValueError(
+                    f"'{key}' is not a valid attribute of the "
+                    f"{model.__name__} model"
+            )
+
+
 class DB:
     """
     DB class
     """
 
-    def __init__(self) -> None:
+    def __init__(self, database_url: str = None,
+                 drop_existing: bool = None) -> None:
         """
         Initialize a new DB instance
+
+        Args:
+            database_url (str): The database URL, AUTH_DB_URL or
+                sqlite:///a.db by default.
+            drop_existing (bool): Whether to drop existing tables first,
+                unless AUTH_DB_DROP=0 by default.
         """
-        self._engine = create_engine("sqlite:///a.db")
-        Base.metadata.drop_all(self._engine)
+        if database_url is None:
+            database_url = getenv("AUTH_DB_URL", "sqlite:///a.db")
+        if drop_existing is None:
+            drop_existing = getenv("AUTH_DB_DROP", "1") == "1"
+        self._engine = _create_engine(database_url)
+        if drop_existing:
+            Base.metadata.drop_all(self._engine)
         Base.metadata.create_all(self._engine)
-        self.__session = None
+        self.__session = scoped_session(
+            sessionmaker(bind=self._engine, expire_on_commit=False))
+
+    @property
+    def engine(self) -> Engine:
+        """
+        Return the engine of the database.
+        """
+        return self._engine
 
     def _session(self) -> Session:
         """
-        Memoize session object
+        Return the session of the current thread
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """
+        Close the session of the current thread and return its
+        connection to the pool (call at the end of each request).
+        """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -43,13 +153,67 @@ class DB:
 
         Returns:
             User: The User object that was created.
+
+        Raises:
+            IntegrityError: If the email is already registered.
         """
         new_user = User(email=email, hashed_password=hashed_password)
         session = self._session()
         session.add(new_user)
-        session.commit()
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            raise
         return new_user
 
+    def add_users(self, users: List[Dict[str, str]]) -> None:
+        """
+        Insert many users with one executemany and one commit.
+
+        Args:
+            users (List[Dict[str, str]]): The email and hashed_password
+                of each user.
+
+        Raises:
+            IntegrityError: If an email is already registered.
+        """
+        session = self._session()
+        try:
+            session.bulk_insert_mappings(User, users)
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            raise
+
+    def existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        """
+        Return which of the given emails are already registered.
+
+        Args:
+            emails (Iterable[str]): The emails to check.
+
+        Returns:
+            Set[str]: The registered emails.
+        """
+        session = self._session()
+        rows = session.query(User.email).filter(User.email.in_(list(emails)))
+        return {email for email, in rows}
+
+    def iter_emails(self, batch_size: int = 10000) -> Iterator[str]:
+        """
+        Stream all registered emails.
+
+        Args:
+            batch_size (int): Rows fetched per round trip.
+
+        Returns:
+            Iterator[str]: The emails.
+        """
+        session = self._session()
+        for email, in session.query(User.email).yield_per(batch_size):
+            yield email
+
     def find_user_by(self, **kwargs) -> User:
         """
         Find a user by an arbitrary attribute.
@@ -76,7 +240,7 @@ class DB:
 
     def update_user(self, user_id: int, **kwargs) -> None:
         """
-        Update a user's attributes.
+        Update a user's attributes with a single UPDATE ... WHERE id=?.
 
         Args:
             user_id (int): The ID of the user to update.
@@ -85,21 +249,82 @@ class DB:
             None
 
         Raises:
-            ValueError: If an attribute does not exist on the User model.
+            ValueError: If an attribute is not a column of the User model.
+            NoResultFound: If no user has this ID.
+        """
+        check_columns(User, kwargs)
+        if not kwargs:
+            # nothing to set, only check that the user exists
+            self.find_user_by(id=user_id)
+            return
+        session = self._session()
+        updated = session.query(User).filter(User.id == user_id).update(
+            kwargs, synchronize_session=False)
+        session.commit()
+        if not updated:
+            raise NoResultFound(f"No user found with the criteria: "
+                                f"{{'id': {user_id}}}")
+        # keep a User already loaded in this session in sync without
+        # reading the row back
+        user = session.identity_map.get(identity_key(User, user_id))
+        if user is not None:
+            for key, value in kwargs.items():
+                set_committed_value(user, key, value)
+
+    def update_users(self, updates: List[Dict[str, Any]]) -> None:
+        """
+        Update many users in one transaction; updates setting the same
+        attributes are sent as one executemany.
+
+        Objects already loaded in the session are not refreshed.
+
+        Args:
+            updates (List[Dict[str, Any]]): The "id" of each user and the
+                attributes to set.
+
+        Raises:
+            ValueError: If an update has no "id" or an attribute is not a
+                column of the User model.
+            NoResultFound: If no user has one of the ids; nothing is
+                updated then.
+        """
+        for values in updates:
+            if "id" not in values:
+                raise ValueError("Every update needs the user's 'id'")
+            check_columns(User, values)
+        session = self._session()
+        try:
+            session.bulk_update_mappings(User, updates)
+            session.commit()
+        except StaleDataError:
+            # fewer rows matched than updates were sent
+            session.rollback()
+            ids = {values["id"] for values in updates}
+            found = {user_id for user_id, in session.query(User.id).filter(
+                User.id.in_(ids))}
+            session.commit()
+            raise NoResultFound(
+                f"No user found with the criteria: "
+                f"{{'id': {sorted(ids - found)}}}")
+        except Exception:
+            session.rollback()
+            raise
+
+    def clear_sessions_before(self, cutoff: datetime) -> int:
+        """
+        Clear the sessions created before a given time.
+
+        Args:
+            cutoff (datetime): Sessions older than this are expired.
+
+        Returns:
+            int: The number of sessions cleared.
         """
         session = self._session()
-        # Locate the user using find_user_by method
-        user = self.find_user_by(id=user_id)
-
-        # Loop through the keyword arguments to update user attributes
-        for key, value in kwargs.items():
-            # Check if the attribute exists on the User model
-            if not hasattr(user, key):
-                raise ValueError(
-                        f"'{key}' is not a valid attribute of the User model"
-                )
-            # Set the attribute value
-            setattr(user, key, value)
-
-        # Commit the changes to the database
+        cleared = session.query(User).filter(
+            User.session_id.isnot(None),
+            User.session_created_at < cutoff
+        ).update({User.session_id: None, User.session_created_at: None},
+                 synchronize_session=False)
         session.commit()
+        return cleared
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Bounded worker pool for password hashing and verification.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict
+
+
+class PoolOverloaded(Exception):
+    """
+    Raised when the hashing queue is full and a job is refused.
+    """
+
+
+class HashingPool:
+    """
+    Thread pool running bcrypt jobs off the request threads (bcrypt
+    releases the GIL). At most `workers + max_queue` jobs are accepted
+    at once; callers beyond that get PoolOverloaded straight away.
+    """
+
+    def __init__(self, workers: int = None, max_queue: int = None,
+                 timeout: float = None) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            workers (int): Worker threads, AUTH_HASH_WORKERS or the
+                number of cores by default.
+            max_queue (int): Jobs allowed to wait for a worker,
+                AUTH_HASH_QUEUE or 4 per worker by default.
+            timeout (float): Seconds a caller waits for its result,
+                AUTH_HASH_TIMEOUT or 30 by default.
+        """
+        if workers is None:
+            workers = int(os.getenv("AUTH_HASH_WORKERS",
+                                    str(os.cpu_count() or 1)))
+        if max_queue is None:
+            max_queue = int(os.getenv("AUTH_HASH_QUEUE", str(4 * workers)))
+        if timeout is None:
+            timeout = float(os.getenv("AUTH_HASH_TIMEOUT", "30"))
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="hashing")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._latency = {}
+
+    def _admit(self) -> None:
+        """
+        Take a slot for a new job.
+
+        Raises:
+            PoolOverloaded: If the queue is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PoolOverloaded("hashing queue is full")
+        with self._lock:
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        """
+        Give back the slot of a finished job.
+        """
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _submit(self, func: Callable, *args: Any) -> Future:
+        """
+        Admit and queue a job; its slot is given back when the job
+        finishes, not when the caller stops waiting for it.
+
+        Raises:
+            PoolOverloaded: If the queue is full.
+        """
+        self._admit()
+        try:
+            future = self._executor.submit(self._timed, func, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _timed_out_error(self) -> PoolOverloaded:
+        """
+        Count a job the caller gave up on and return the error to raise.
+        """
+        with self._lock:
+            self._timed_out += 1
+        return PoolOverloaded(
+            "hashing job not done after {}s".format(self.timeout))
+
+    def run(self, func: Callable, *args: Any) -> Any:
+        """
+        Run `func(*args)` on the pool and wait for its result.
+
+        Raises:
+            PoolOverloaded: If the queue is full or the job times out.
+        """
+        future = self._submit(func, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise self._timed_out_error()
+
+    async def run_async(self, func: Callable, *args: Any) -> Any:
+        """
+        Run `func(*args)` on the pool without blocking the event loop.
+
+        Raises:
+            PoolOverloaded: If the queue is full or the job times out.
+        """
+        future = self._submit(func, *args)
+        try:
+            # shield: a timeout must not cancel the pool future, whose
+            # slot is only released once the job really finishes
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out_error()
+
+    def _timed(self, func: Callable, *args: Any) -> Any:
+        """
+        Run a job and record how long it took.
+        """
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                count, total, worst = self._latency.get(
+                    func.__name__, (0, 0.0, 0.0))
+                self._latency[func.__name__] = (
+                    count + 1, total + elapsed, max(worst, elapsed))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the queue depth, rejections and per-job latency.
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "latency": {
+                    name: {"count": count,
+                           "mean_seconds": total / count,
+                           "max_seconds": worst}
+                    for name, (count, total, worst) in self._latency.items()
+                },
+            }
+
+    def shutdown(self) -> None:
+        """
+        Stop the worker threads once running jobs are done.
+        """
+        self._executor.shutdown(wait=True)
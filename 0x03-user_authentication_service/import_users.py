@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Bulk import of users into the auth database from a CSV or JSONL file
+with 'email' and 'password' fields. Rows are streamed in chunks: each
+chunk is deduplicated in memory and against the database, hashed in
+parallel and inserted with one executemany and one commit.
+Usage: ./import_users.py FILE [--chunk-size N] [--workers N]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List
+from auth import _hash_password
+from db import DB
+
+
+def read_rows(path: str) -> Iterator[Dict[str, str]]:
+    """
+    Stream the rows of a CSV (with a header) or JSONL file.
+    """
+    with open(path, newline='') as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def hash_one(row: Dict[str, str]) -> Dict[str, str]:
+    """
+    Return the insert mapping of a row.
+    """
+    return {"email": row["email"],
+            "hashed_password": _hash_password(row["password"]).decode()}
+
+
+def import_users(path: str, chunk_size: int, workers: int) -> None:
+    """
+    Import every new user of a file, printing progress and rows/s.
+    """
+    db = DB(drop_existing=False)
+    seen = set()
+    imported = skipped = read = 0
+    rows = read_rows(path)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if len(chunk) == 0:
+                break
+            read += len(chunk)
+            fresh = []
+            for row in chunk:
+                email = row.get("email")
+                if not email or not row.get("password") or email in seen:
+                    continue
+                seen.add(email)
+                fresh.append(row)
+            existing = db.existing_emails(row["email"] for row in fresh)
+            fresh = [row for row in fresh if row["email"] not in existing]
+            # bcrypt releases the GIL, threads hash on all cores
+            mappings: List[Dict[str, str]] = list(
+                executor.map(hash_one, fresh))
+            if mappings:
+                db.add_users(mappings)
+            imported += len(mappings)
+            skipped += len(chunk) - len(mappings)
+            elapsed = time.perf_counter() - start
+            print("\r{} read, {} imported, {} skipped, {:.1f} rows/s".format(
+                read, imported, skipped, read / elapsed),
+                end="", file=sys.stderr, flush=True)
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    print(json.dumps({"read": read, "imported": imported,
+                      "skipped": skipped, "seconds": round(elapsed, 3),
+                      "rows_per_second": round(read / elapsed, 1)
+                      if elapsed else 0.0}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    import_users(args.path, args.chunk_size, args.workers)
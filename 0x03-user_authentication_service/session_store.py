@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Session stores: where session IDs live and how they resolve to users.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy.orm.exc import NoResultFound
+from db import DB
+from user import User
+
+
+class SessionStore(ABC):
+    """
+    Interface of a session store.
+    """
+
+    @abstractmethod
+    def create(self, user_id: int, session_id: str) -> None:
+        """
+        Attach a new session ID to a user.
+        """
+
+    @abstractmethod
+    def find_user(self, session_id: str) -> Optional[User]:
+        """
+        Return the user of a live session, or None.
+        """
+
+    @abstractmethod
+    def destroy(self, user_id: int) -> None:
+        """
+        End the session of a user.
+        """
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """
+        Drop expired sessions and return how many were dropped.
+        """
+
+    def expires_in(self, user: User) -> Optional[float]:
+        """
+        Return the seconds left before the session of a user expires,
+        or None if it doesn't expire.
+        """
+        return None
+
+
+class SQLAlchemySessionStore(SessionStore):
+    """
+    Sessions kept in the session_id column of the users table.
+    """
+
+    def __init__(self, db: DB, lifetime: float) -> None:
+        """
+        Initialize the store.
+
+        Args:
+            db (DB): The database.
+            lifetime (float): Session lifetime in seconds, 0 for no limit.
+        """
+        self._db = db
+        self.lifetime = lifetime
+
+    def _cutoff(self) -> Optional[datetime]:
+        """
+        Return the creation time before which sessions are expired.
+        """
+        if self.lifetime <= 0:
+            return None
+        return datetime.utcnow() - timedelta(seconds=self.lifetime)
+
+    def expires_in(self, user: User) -> Optional[float]:
+        """
+        Return the seconds left before the session of a user expires.
+        """
+        if self.lifetime <= 0 or user.session_created_at is None:
+            return None
+        age = datetime.utcnow() - user.session_created_at
+        return self.lifetime - age.total_seconds()
+
+    def create(self, user_id: int, session_id: str) -> None:
+        """
+        Attach a new session ID to a user.
+        """
+        self._db.update_user(user_id, session_id=session_id,
+                             session_created_at=datetime.utcnow())
+
+    def find_user(self, session_id: str) -> Optional[User]:
+        """
+        Return the user of a live session, or None.
+        """
+        try:
+            user = self._db.find_user_by(session_id=session_id)
+        except NoResultFound:
+            return None
+        expires_in = self.expires_in(user)
+        if expires_in is not None and expires_in <= 0:
+            return None
+        return user
+
+    def destroy(self, user_id: int) -> None:
+        """
+        End the session of a user.
+        """
+        self._db.update_user(user_id, session_id=None,
+                             session_created_at=None)
+
+    def sweep(self) -> int:
+        """
+        Clear expired sessions in the database.
+        """
+        cutoff = self._cutoff()
+        if cutoff is None:
+            return 0
+        return self._db.clear_sessions_before(cutoff)
+
+
+class CachedSessionStore(SessionStore):
+    """
+    In-process LRU cache with a time to live in front of another store.
+    Logging out through this store invalidates the entry at once;
+    other processes keep serving it until their entry expires.
+    """
+
+    def __init__(self, store: SessionStore,
+                 max_size: int = 10000, ttl: float = 60) -> None:
+        """
+        Initialize an empty cache.
+
+        Args:
+            store (SessionStore): The store behind the cache.
+            max_size (int): The maximum number of cached sessions.
+            ttl (float): The lifetime of a cache entry in seconds.
+        """
+        self._store = store
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+        # a lookup that read the store before a create/destroy of the
+        # same user finished must not cache what it read: changes are
+        # numbered, and recorded per user while lookups are in flight
+        self._version = 0
+        self._changed = {}
+        self._reading = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _evict(self, session_id: str) -> None:
+        """
+        Drop a cache entry (lock held).
+        """
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._by_user.pop(entry[0].id, None)
+
+    def _change(self, user_id: int) -> None:
+        """
+        Drop the cached session of a user and number the change so
+        lookups in flight don't cache a stale read (lock held).
+        """
+        old = self._by_user.get(user_id)
+        if old is not None:
+            self._evict(old)
+        self._version += 1
+        if self._reading:
+            self._changed[user_id] = self._version
+
+    def _changing(self, user_id: int, change) -> None:
+        """
+        Apply a change to the session of a user in the store, numbered
+        before and after so reads on either side of it are caught.
+        """
+        with self._lock:
+            self._change(user_id)
+        try:
+            change()
+        finally:
+            with self._lock:
+                self._change(user_id)
+
+    def create(self, user_id: int, session_id: str) -> None:
+        """
+        Attach a new session ID to a user.
+        """
+        self._changing(user_id,
+                       lambda: self._store.create(user_id, session_id))
+
+    def find_user(self, session_id: str) -> Optional[User]:
+        """
+        Return the user of a live session, from the cache if possible.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._evict(session_id)
+            self.misses += 1
+            start = self._version
+            self._reading += 1
+
+        user = None
+        ttl = self.ttl
+        try:
+            user = self._store.find_user(session_id)
+            if user is not None:
+                expires_in = self._store.expires_in(user)
+                if expires_in is not None:
+                    ttl = min(ttl, expires_in)
+        finally:
+            with self._lock:
+                if user is not None \
+                        and self._changed.get(user.id, start) <= start:
+                    self._evict(session_id)
+                    self._entries[session_id] = (user, now + ttl)
+                    self._by_user[user.id] = session_id
+                    while len(self._entries) > self.max_size:
+                        self._evict(next(iter(self._entries)))
+                self._reading -= 1
+                if not self._reading:
+                    self._changed.clear()
+        return user
+
+    def destroy(self, user_id: int) -> None:
+        """
+        End the session of a user and drop it from the cache.
+        """
+        self._changing(user_id, lambda: self._store.destroy(user_id))
+
+    def sweep(self) -> int:
+        """
+        Drop expired cache entries, then expired stored sessions.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [session_id
+                       for session_id, (_, expires) in self._entries.items()
+                       if expires <= now]
+            for session_id in expired:
+                self._evict(session_id)
+        return self._store.sweep()
+
+    def stats(self) -> Tuple[int, int, int]:
+        """
+        Return the cache size, hits and misses.
+        """
+        with self._lock:
+            return len(self._entries), self.hits, self.misses
+
+
+class SessionSweeper(threading.Thread):
+    """
+    Background thread sweeping a session store at a fixed interval.
+    """
+
+    def __init__(self, store: SessionStore, interval: float,
+                 on_sweep=None) -> None:
+        """
+        Initialize the sweeper.
+
+        Args:
+            store (SessionStore): The store to sweep.
+            interval (float): Seconds between two sweeps.
+            on_sweep (callable): Called after each sweep, e.g. to
+                release the database session of this thread.
+        """
+        super().__init__(name="session-sweeper", daemon=True)
+        self._store = store
+        self.interval = interval
+        self._on_sweep = on_sweep
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        """
+        Sweep until stopped.
+        """
+        while not self._stopped.wait(self.interval):
+            try:
+                self._store.sweep()
+            except Exception:
+                # a failed sweep is retried at the next interval
+                pass
+            finally:
+                if self._on_sweep is not None:
+                    self._on_sweep()
+
+    def stop(self) -> None:
+        """
+        Stop the sweeper after the current sweep.
+        """
+        self._stopped.set()
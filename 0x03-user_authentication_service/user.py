@@ -3,7 +3,7 @@
 User model for the database
 """
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -14,7 +14,8 @@ class User(Base):
     __tablename__ = 'users'
 
     id = Column(Integer, primary_key=True)
-    email = Column(String(128), nullable=False)
+    email = Column(String(128), nullable=False, unique=True)
     hashed_password = Column(String(128), nullable=False)
-    session_id = Column(String(250))
-    reset_token = Column(String(250))
+    session_id = Column(String(250), index=True)
+    session_created_at = Column(DateTime)
+    reset_token = Column(String(250), index=True)
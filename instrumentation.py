@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Shared metrics for the Flask apps of this repository: per-route latency
+histograms, SQLAlchemy query timing, timers around any function or
+method, callback gauges and a Prometheus text /metrics endpoint.
+Put the repository root on PYTHONPATH and set METRICS_ENABLED=1.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed durations, in seconds.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        """
+        Initialize empty buckets.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Record one value (the caller holds the metrics lock).
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Registry of histograms and gauges rendered in Prometheus text format.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """
+        Initialize an empty registry.
+        """
+        self.buckets = buckets
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._gauges: Dict[str, Callable[[], Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str) -> None:
+        """
+        Set the help line of a metric.
+        """
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Record a duration in the histogram `name` with these labels.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """
+        Time the body of a with statement.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def wrap(self, func: Callable, name: str, **labels: str) -> Callable:
+        """
+        Return `func` timed into the histogram `name`.
+        """
+        @wraps(func)
+        def timed(*args, **kwargs):
+            """
+            Call the wrapped function and record its duration.
+            """
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe(name, time.perf_counter() - start, **labels)
+        return timed
+
+    def instrument_function(self, module, attribute: str, name: str,
+                            **labels: str) -> None:
+        """
+        Replace a module level function by its timed version.
+        """
+        setattr(module, attribute,
+                self.wrap(getattr(module, attribute), name, **labels))
+
+    def instrument_method(self, cls: type, attribute: str, name: str,
+                          **labels: str) -> None:
+        """
+        Replace a method, classmethod or staticmethod by its timed version.
+        """
+        method = cls.__dict__[attribute]
+        if isinstance(method, (classmethod, staticmethod)):
+            timed = type(method)(self.wrap(method.__func__, name, **labels))
+        else:
+            timed = self.wrap(method, name, **labels)
+        setattr(cls, attribute, timed)
+
+    def gauge(self, name: str, func: Callable[[], Optional[float]],
+              help_text: str = None) -> None:
+        """
+        Register a gauge read from `func` at each scrape.
+        """
+        self._gauges[name] = func
+        if help_text is not None:
+            self.describe(name, help_text)
+
+    def init_flask(self, app, path: str = "/metrics") -> None:
+        """
+        Time every request by route and serve the metrics at `path`.
+        """
+        from flask import Response, g, request
+
+        self.describe("http_request_duration_seconds",
+                      "HTTP request latency by method, route and status")
+
+        @app.before_request
+        def _start_timer() -> None:
+            """
+            Remember when the request started.
+            """
+            g.metrics_start = time.perf_counter()
+
+        @app.after_request
+        def _record_duration(response):
+            """
+            Record the request latency.
+            """
+            start = g.pop("metrics_start", None)
+            if start is not None:
+                rule = request.url_rule
+                self.observe("http_request_duration_seconds",
+                             time.perf_counter() - start,
+                             method=request.method,
+                             route=rule.rule if rule else "unmatched",
+                             status=str(response.status_code))
+            return response
+
+        def metrics_endpoint():
+            """
+            GET /metrics: Prometheus text exposition.
+            """
+            return Response(self.render(),
+                            mimetype="text/plain; version=0.0.4")
+
+        app.add_url_rule(path, "metrics", metrics_endpoint, methods=["GET"])
+
+    def init_sqlalchemy(self, engine) -> None:
+        """
+        Time every SQL statement run by `engine`, by statement type.
+        """
+        from sqlalchemy import event
+
+        self.describe("db_query_duration_seconds",
+                      "SQL statement latency by statement type")
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context,
+                    executemany):
+            """
+            Remember when the statement started, on its execution context
+            so a failed statement leaves nothing behind.
+            """
+            if context is not None:
+                context._metrics_start = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context,
+                   executemany):
+            """
+            Record the statement latency.
+            """
+            start = getattr(context, "_metrics_start", None)
+            if start is None:
+                return
+            verb = statement.lstrip().split(None, 1)[0].upper() \
+                if statement.strip() else "OTHER"
+            self.observe("db_query_duration_seconds",
+                         time.perf_counter() - start, statement=verb)
+
+    def render(self) -> str:
+        """
+        Return all metrics in Prometheus text format.
+        """
+        lines: List[str] = []
+        with self._lock:
+            histograms = {name: {labels: (list(h.counts), h.sum, h.count)
+                                 for labels, h in series.items()}
+                          for name, series in self._histograms.items()}
+        for name in sorted(histograms):
+            if name in self._help:
+                lines.append("# HELP {} {}".format(name, self._help[name]))
+            lines.append("# TYPE {} histogram".format(name))
+            for labels, (counts, total, count) in histograms[name].items():
+                cumulative = 0
+                bounds = [repr(b) for b in self.buckets] + ["+Inf"]
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    lines.append("{}_bucket{} {}".format(
+                        name, _labels(labels + (("le", bound),)),
+                        cumulative))
+                lines.append("{}_sum{} {}".format(name, _labels(labels),
+                                                  total))
+                lines.append("{}_count{} {}".format(name, _labels(labels),
+                                                    count))
+        for name in sorted(self._gauges):
+            try:
+                value = self._gauges[name]()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            if name in self._help:
+                lines.append("# HELP {} {}".format(name, self._help[name]))
+            lines.append("# TYPE {} gauge".format(name))
+            lines.append("{} {}".format(name, value))
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    """
+    Format labels as {a="x",b="y"}.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(
+        k, v.replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in labels) + "}"
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Load test of the 0x01 users API and the 0x03 auth service.
+Each app is started locally against temporary storage, seeded with
+users, then driven by concurrent clients; req/s and p50/p95/p99
+latencies are written as JSON (optionally compared to a previous run).
+Usage: ./loadtest.py [--users N] [--requests N] [--concurrency N]
+                     [--workloads read,write,register] [--output FILE]
+                     [--compare FILE]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BASIC_AUTH_DIR = os.path.join(ROOT, "0x01-Basic_authentication")
+AUTH_SERVICE_DIR = os.path.join(ROOT, "0x03-user_authentication_service")
+
+# one request: (method, path, body, headers)
+Request = Tuple[str, str, bytes, Dict[str, str]]
+
+
+def free_port() -> int:
+    """
+    Return a free local TCP port.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(project_dir: str, module: str, env: Dict[str, str],
+                 cwd: str) -> Tuple[subprocess.Popen, int]:
+    """
+    Start the Flask `app` of a module in a subprocess and wait for it.
+    """
+    port = free_port()
+    code = ("from {} import app; app.run(host='127.0.0.1', port={}, "
+            "threaded=True)").format(module, port)
+    env = dict(os.environ, PYTHONPATH=project_dir, **env)
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=cwd,
+                               env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("{} didn't start".format(module))
+
+
+def percentile(sorted_values: List[float], rank: float) -> float:
+    """
+    Return the nearest-rank percentile of sorted values.
+    """
+    if not sorted_values:
+        return 0.0
+    index = max(0, int(round(rank / 100 * len(sorted_values))) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def drive(port: int, next_request: Callable[[int], Request],
+          requests: int, concurrency: int) -> Dict[str, float]:
+    """
+    Send `requests` requests from `concurrency` threads, each with its
+    own connection, and return throughput and latency statistics.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(index: int) -> None:
+        """
+        Send the requests of one client.
+        """
+        connection = http.client.HTTPConnection("127.0.0.1", port, 30)
+        local, failed = [], 0
+        for i in range(index, requests, concurrency):
+            method, path, body, headers = next_request(i)
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+            local.append(time.perf_counter() - start)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=worker, args=(i,))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": sum(errors),
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1e3, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1e3, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1e3, 2),
+    }
+
+
+def json_request(method: str, path: str, payload=None) -> Request:
+    """
+    Build a JSON request.
+    """
+    body = b"" if payload is None else json.dumps(payload).encode()
+    return method, path, body, {"Content-Type": "application/json"}
+
+
+def form_request(method: str, path: str, fields: Dict[str, str]) -> Request:
+    """
+    Build a form-encoded request.
+    """
+    return method, path, urlencode(fields).encode(), {
+        "Content-Type": "application/x-www-form-urlencoded"}
+
+
+def bench_basic_auth(args: argparse.Namespace) -> List[Dict]:
+    """
+    Run the read and write workloads against the 0x01 users API.
+    """
+    results = []
+    workloads = [w for w in args.workloads if w in ("read", "write")]
+    if not workloads:
+        return results
+    env = {}
+    if args.hash_cost is not None:
+        env["USER_PASSWORD_ITERATIONS"] = str(args.hash_cost)
+    with tempfile.TemporaryDirectory() as cwd:
+        process, port = start_server(BASIC_AUTH_DIR, "api.v1.app", env, cwd)
+        try:
+            # seeding hashes every password: it is timed and reported,
+            # as the cost of the batch endpoint
+            connection = http.client.HTTPConnection("127.0.0.1", port, 600)
+            ids = []
+            latencies = []
+            failed = 0
+            seed_start = time.perf_counter()
+            for start in range(0, args.users, 250):
+                users = [{"email": "seed{}@example.com".format(i),
+                          "password": "secret"}
+                         for i in range(start, min(start + 250, args.users))]
+                batch_start = time.perf_counter()
+                connection.request(*json_request(
+                    "POST", "/api/v1/users/batch", users))
+                response = connection.getresponse()
+                created = json.loads(response.read())
+                latencies.append(time.perf_counter() - batch_start)
+                if response.status >= 400:
+                    failed += 1
+                    continue
+                ids += [user["id"] for user in created["created"]]
+            seed_seconds = time.perf_counter() - seed_start
+            connection.close()
+            latencies.sort()
+            results.append(dict(
+                api="0x01", workload="seed", requests=len(latencies),
+                errors=failed, seconds=round(seed_seconds, 3),
+                rps=round(len(latencies) / seed_seconds, 1),
+                users_per_s=round(len(ids) / seed_seconds, 1),
+                p50_ms=round(percentile(latencies, 50) * 1e3, 2),
+                p95_ms=round(percentile(latencies, 95) * 1e3, 2),
+                p99_ms=round(percentile(latencies, 99) * 1e3, 2)))
+            if not ids:
+                raise RuntimeError("seeding the 0x01 API failed")
+
+            def read(i: int) -> Request:
+                """
+                Nine single-user reads for one page of the list.
+                """
+                if i % 10 == 0:
+                    return json_request("GET", "/api/v1/users?limit=100")
+                return json_request(
+                    "GET", "/api/v1/users/{}".format(random.choice(ids)))
+
+            def write(i: int) -> Request:
+                """
+                Alternate creations and updates.
+                """
+                if i % 2 == 0:
+                    return json_request("POST", "/api/v1/users", {
+                        "email": "load{}@example.com".format(i),
+                        "password": "secret"})
+                return json_request(
+                    "PUT", "/api/v1/users/{}".format(random.choice(ids)),
+                    {"first_name": "Load{}".format(i)})
+
+            for name in workloads:
+                stats = drive(port, {"read": read, "write": write}[name],
+                              args.requests, args.concurrency)
+                results.append(dict(api="0x01", workload=name, **stats))
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+
+def bench_auth_service(args: argparse.Namespace) -> List[Dict]:
+    """
+    Run the registration burst against the 0x03 auth service.
+    """
+    results = []
+    if "register" not in args.workloads:
+        return results
+    with tempfile.TemporaryDirectory() as cwd:
+        env = {"AUTH_DB_URL": "sqlite:///{}".format(
+                   os.path.join(cwd, "load.db")),
+               "AUTH_DB_DROP": "0",
+               "AUTH_BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+               "AUTH_HASH_QUEUE": str(4 * args.concurrency),
+               "ADMISSION_CONCURRENCY": str(5 * args.concurrency)}
+        seed = os.path.join(cwd, "seed.jsonl")
+        with open(seed, "w") as f:
+            for i in range(args.users):
+                f.write(json.dumps({"email": "seed{}@example.com".format(i),
+                                    "password": "secret"}) + "\n")
+        subprocess.run([sys.executable,
+                        os.path.join(AUTH_SERVICE_DIR, "import_users.py"),
+                        seed], cwd=cwd, env=dict(os.environ, **env),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       check=True)
+        process, port = start_server(AUTH_SERVICE_DIR, "app", env, cwd)
+        try:
+            def register(i: int) -> Request:
+                """
+                Register a new user.
+                """
+                return form_request("POST", "/users", {
+                    "email": "load{}@example.com".format(i),
+                    "password": "secret"})
+
+            stats = drive(port, register, args.requests, args.concurrency)
+            results.append(dict(api="0x03", workload="register", **stats))
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+
+def compare(previous: Dict, current: Dict) -> None:
+    """
+    Print the change of req/s and p99 for each workload of both runs.
+    """
+    before = {(r["api"], r["workload"]): r for r in previous["results"]}
+    for result in current["results"]:
+        old = before.get((result["api"], result["workload"]))
+        if old is None:
+            continue
+        print("{} {:<8} rps {:>+7.1f}%  p99 {:>+7.1f}%".format(
+            result["api"], result["workload"],
+            (result["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0.0,
+            (result["p99_ms"] / old["p99_ms"] - 1) * 100
+            if old["p99_ms"] else 0.0), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workloads", default="read,write,register")
+    parser.add_argument("--hash-cost", type=int,
+                        help="PBKDF2 iterations of the 0x01 API "
+                             "(default: the API's own default)")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="previous JSON report")
+    args = parser.parse_args()
+    args.workloads = args.workloads.split(",")
+
+    report = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "cores": os.cpu_count(), "users": args.users,
+                 "requests": args.requests,
+                 "concurrency": args.concurrency,
+                 "hash_cost": args.hash_cost,
+                 "bcrypt_rounds": args.bcrypt_rounds},
+        "results": bench_basic_auth(args) + bench_auth_service(args),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)